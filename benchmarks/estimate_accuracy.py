@@ -0,0 +1,128 @@
+"""Compare the preview's cost estimate with measured merges.
+
+Generates a small corpus of Main and Source PDFs in a temporary directory,
+then for each case prints the estimated and the measured output size,
+peak memory and duration. Each merge runs in a fresh process so its peak
+memory (ru_maxrss) is not inflated by earlier cases.
+
+    python benchmarks/estimate_accuracy.py
+"""
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import fitz
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_inserter import PDFMerger, RASTERIZE_DPI  # noqa: E402
+
+
+def make_text_pdf(path, pages, lines, links=0, indirect_annots=False):
+    """Text pages, optionally with GoTo links to random pages"""
+    random.seed(pages)
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        for line in range(lines):
+            page.insert_text((72, 72 + line * 12),
+                             f"Page {i + 1} line {line} lorem ipsum dolor sit amet")
+    for i in range(pages):
+        page = doc[i]
+        for k in range(links):
+            page.insert_link({
+                "kind": fitz.LINK_GOTO, "page": random.randrange(pages),
+                "from": fitz.Rect(72, 100 + k * 20, 200, 115 + k * 20),
+                "to": fitz.Point(0, 0)})
+        if indirect_annots and links:
+            kind, annots = doc.xref_get_key(page.xref, "Annots")
+            xref = doc.get_new_xref()
+            doc.update_object(xref, annots)
+            doc.xref_set_key(page.xref, "Annots", f"{xref} 0 R")
+    doc.save(path, garbage=1, deflate=True)
+    doc.close()
+
+
+def make_vector_pdf(path, pages, segments):
+    """Drawing-like pages of many short line segments"""
+    random.seed(segments)
+    doc = fitz.open()
+    for _ in range(pages):
+        shape = doc.new_page().new_shape()
+        for _ in range(segments):
+            x, y = random.random() * 595, random.random() * 842
+            shape.draw_line((x, y), (x + random.uniform(-8, 8),
+                                     y + random.uniform(-8, 8)))
+        shape.finish(width=0.3)
+        shape.commit()
+    doc.save(path, deflate=True)
+    doc.close()
+
+
+def run_case(main, source, rules, threshold):
+    """Estimate and then merge one case (runs in a fresh process).
+
+    The merge reports progress to a Qt progress bar like the GUI does, so
+    the measurement includes the Qt baseline the estimate accounts for.
+    """
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication, QProgressBar
+    app = QApplication([])
+    progress_bar = QProgressBar()
+
+    with PDFMerger(main, source) as merger:
+        plan = merger.build_plan(rules)
+        estimate = merger.estimate_cost(plan, threshold, RASTERIZE_DPI)
+        output = os.path.join(os.path.dirname(main), "output.pdf")
+        started = time.perf_counter()
+        merger.merge(rules, output, rasterize_threshold=threshold,
+                     progress=progress_bar.setValue)
+        seconds = time.perf_counter() - started
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    app.quit()
+    return estimate, os.path.getsize(output), peak, seconds
+
+
+def main():
+    directory = tempfile.mkdtemp(prefix="pdf_inserter_bench_")
+    files = {
+        "text_1k": (make_text_pdf, 1000, 40),
+        "text_5k": (make_text_pdf, 5000, 10),
+        "links_2k": (make_text_pdf, 2000, 5, 5),
+        "links_indirect_2k": (make_text_pdf, 2000, 5, 5, True),
+        "source_text": (make_text_pdf, 20, 50),
+        "source_vector": (make_vector_pdf, 6, 40000),
+    }
+    paths = {}
+    for name, (maker, *args) in files.items():
+        paths[name] = os.path.join(directory, name + ".pdf")
+        maker(paths[name], *args)
+
+    cases = [
+        ("text_1k", "source_text", [("Replace existing pages", [1, 2, 3], [10, 11, 12]),
+                                    ("Insert before position", [4, 5], [500, 500])], None),
+        ("text_5k", "source_text", [("Append at end", list(range(1, 21)), [5001] * 20)], None),
+        ("links_2k", "source_text", [("Insert after position", [1, 2], [100, 100])], None),
+        ("links_indirect_2k", "source_text", [("Insert after position", [1, 2], [100, 100])], None),
+        ("text_1k", "source_vector", [("Insert before position", [1, 2, 3, 4, 5, 6], [20] * 6)], None),
+        ("text_1k", "source_vector", [("Insert before position", [1, 2, 3, 4, 5, 6], [20] * 6)], 256 * 1024),
+    ]
+
+    print(f"{'case':42} {'size est/act MB':>17} {'memory est/act MB':>19} {'time est/act s':>16}")
+    for main_name, source_name, rules, threshold in cases:
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            estimate, size, peak, seconds = pool.submit(
+                run_case, paths[main_name], paths[source_name], rules, threshold).result()
+        label = f"{main_name} + {source_name}" + (" (rasterized)" if threshold else "")
+        print(f"{label:42} "
+              f"{estimate['output_bytes'] / 2**20:8.2f}/{size / 2**20:<8.2f} "
+              f"{estimate['memory_bytes'] / 2**20:9.0f}/{peak / 2**20:<9.0f} "
+              f"{estimate['seconds']:7.2f}/{seconds:<7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Time link and bookmark remapping on large, densely linked documents.
+
+Generates Main PDFs of 1k to 10k pages with 10 GoTo links per page (100k
+links at 10k pages) and a bookmark every 100 pages, merges a few Source
+pages into each, and checks every link and bookmark of the output against
+the old->new page map. Prints the merge and remap times for each size,
+the remap time per link, which stays flat when remapping is linear, and
+the number of wrong targets, which must be 0. (The rest of the merge is
+dominated by MuPDF copying the pages, which is not linear in the page
+count itself.)
+
+    python benchmarks/link_remap.py [pages ...]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+import fitz
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_inserter import PDFMerger  # noqa: E402
+
+LINKS_PER_PAGE = 10
+PAGES_PER_BOOKMARK = 100
+
+
+def make_linked_pdf(path, pages):
+    """Pages with LINKS_PER_PAGE GoTo links to random pages and bookmarks"""
+    random.seed(pages)
+    doc = fitz.open()
+    for i in range(pages):
+        doc.new_page().insert_text((72, 72), f"Main page {i + 1}")
+    for i in range(pages):
+        page = doc[i]
+        for k in range(LINKS_PER_PAGE):
+            page.insert_link({
+                "kind": fitz.LINK_GOTO, "page": random.randrange(pages),
+                "from": fitz.Rect(72, 100 + k * 20, 200, 115 + k * 20),
+                "to": fitz.Point(72, 72)})
+    doc.set_toc([[1, f"Chapter {c + 1}", c * PAGES_PER_BOOKMARK + 1]
+                 for c in range(pages // PAGES_PER_BOOKMARK)])
+    doc.save(path, garbage=1, deflate=True)
+    doc.close()
+
+
+def make_source_pdf(path, pages):
+    doc = fitz.open()
+    for i in range(pages):
+        doc.new_page().insert_text((72, 72), f"Source page {i + 1}")
+    doc.save(path)
+    doc.close()
+
+
+def wrong_targets(main, output, plan, page_map):
+    """Count output links and bookmarks not pointing at their mapped page.
+
+    Links are checked on every kept Main page; replaced pages take the
+    Source page's (lack of) links. Output targets are read from the raw
+    /Dest, as older PyMuPDF reports /Fit destinations as named links.
+    """
+    wrong = 0
+    with fitz.open(main) as before, fitz.open(stream=output, filetype="pdf") as after:
+        page_of_xref = {after.page_xref(i): i for i in range(after.page_count)}
+        for new_idx, entry in enumerate(plan):
+            if entry[0] != "main":
+                continue
+            old_idx = entry[1]
+            old_links = [link["page"] for link in before[old_idx].get_links()]
+            new_links = [
+                page_of_xref.get(int(after.xref_get_key(
+                    link["xref"], "Dest")[1][1:].split()[0]))
+                for link in after[new_idx].get_links()]
+            if len(old_links) != len(new_links):
+                wrong += abs(len(old_links) - len(new_links))
+            wrong += sum(page_map.get(old) != new
+                         for old, new in zip(old_links, new_links))
+        old_toc, new_toc = before.get_toc(), after.get_toc()
+        wrong += abs(len(old_toc) - len(new_toc))
+        wrong += sum(page_map.get(old[2] - 1) != new[2] - 1
+                     for old, new in zip(old_toc, new_toc))
+    return wrong
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 2500, 5000, 10000]
+    directory = tempfile.mkdtemp(prefix="pdf_inserter_links_")
+    source = os.path.join(directory, "source.pdf")
+    make_source_pdf(source, 5)
+
+    print(f"{'pages':>6} {'links':>7} {'merge s':>8} {'remap s':>8} "
+          f"{'us/link':>8} {'wrong':>6}")
+    rates = []
+    total_wrong = 0
+    for pages in sizes:
+        main_path = os.path.join(directory, f"links_{pages}.pdf")
+        make_linked_pdf(main_path, pages)
+        rules = [("Replace existing pages", [1], [1]),
+                 ("Insert before position", [2, 3, 4], [pages // 3] * 3),
+                 ("Insert after position", [5], [2 * pages // 3])]
+
+        with PDFMerger(main_path, source) as merger:
+            remap_seconds = []
+
+            def timed_remap(plan, merged_pdf, remap=merger.remap_links):
+                started = time.perf_counter()
+                remap(plan, merged_pdf)
+                remap_seconds.append(time.perf_counter() - started)
+
+            merger.remap_links = timed_remap
+            started = time.perf_counter()
+            output = merger.merge(rules)
+            seconds = time.perf_counter() - started
+            plan = merger.build_plan(rules)
+            page_map = merger.page_index_map(plan)
+
+        links = pages * LINKS_PER_PAGE
+        wrong = wrong_targets(main_path, output, plan, page_map)
+        total_wrong += wrong
+        rates.append(remap_seconds[0] / links)
+        print(f"{pages:6} {links:7} {seconds:8.2f} {remap_seconds[0]:8.2f} "
+              f"{rates[-1] * 1e6:8.1f} {wrong:6}")
+
+    # Linear time: the remap cost per link does not grow with the document
+    growth = rates[-1] / rates[0]
+    print(f"remap time per link, largest vs smallest: {growth:.2f}x "
+          f"({'linear' if growth < 2 else 'NOT linear'}), "
+          f"{total_wrong} wrong targets")
+    return 1 if total_wrong or growth >= 2 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""Measure total memory of N worker processes opening the same Source PDF.
+
+Each worker opens a generated PDF, reads every page's content stream (as
+a merge copying the document does) and reports its memory from
+/proc/self/smaps_rollup (Linux only). Totals over the workers are printed
+for three ways of opening the input:
+
+  bytes  the file read into memory, fitz.open(stream=...)
+  file   MuPDF reading the file itself, fitz.open(path)
+  mmap   a read-only mmap passed as a memoryview stream; this needs a
+         PyMuPDF that accepts memoryview streams (newer than 1.23.8)
+
+PSS divides shared pages between the processes sharing them, so total PSS
+stays flat as N grows only if the workers' memory is mostly shared.
+
+    python benchmarks/rss_vs_workers.py [pages]
+"""
+import mmap
+import multiprocessing
+import os
+import sys
+import tempfile
+
+import fitz
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_inserter import open_input, read_input  # noqa: E402
+
+WORKERS = (1, 2, 4, 8)
+
+
+def make_text_pdf(path, pages, lines=40):
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        for line in range(lines):
+            page.insert_text((72, 72 + line * 12),
+                             f"Page {i + 1} line {line} lorem ipsum dolor sit amet")
+    doc.save(path)
+    doc.close()
+
+
+def memory_kb():
+    """Rss, Pss and private kB of this process"""
+    usage = {}
+    with open("/proc/self/smaps_rollup") as rollup:
+        for line in rollup:
+            key, _, value = line.partition(":")
+            if key in ("Rss", "Pss", "Private_Clean", "Private_Dirty"):
+                usage[key] = int(value.split()[0])
+    usage["Private"] = usage.pop("Private_Clean") + usage.pop("Private_Dirty")
+    return usage
+
+
+def open_mode(mode, path):
+    if mode == "bytes":
+        with open(path, "rb") as pdf_file:
+            return open_input(read_input(pdf_file))
+    if mode == "file":
+        return open_input(path)
+    with open(path, "rb") as pdf_file:
+        buffer = mmap.mmap(pdf_file.fileno(), 0, access=mmap.ACCESS_READ)
+    return fitz.open(stream=memoryview(buffer), filetype="pdf")
+
+
+def worker(mode, path, results, done):
+    try:
+        doc = open_mode(mode, path)
+    except TypeError:
+        results.put(None)
+        return
+    for page in doc:
+        page.read_contents()
+    results.put(memory_kb())
+    # Stay alive until every worker has measured, so pages stay shared
+    done.wait()
+
+
+def measure(mode, path, workers):
+    """Total memory in kB of workers processes, or None if unsupported"""
+    results, done = multiprocessing.Queue(), multiprocessing.Event()
+    processes = [multiprocessing.Process(target=worker, args=(mode, path, results, done))
+                 for _ in range(workers)]
+    for process in processes:
+        process.start()
+    usages = [results.get() for _ in processes]
+    done.set()
+    for process in processes:
+        process.join()
+    if None in usages:
+        return None
+    return {key: sum(usage[key] for usage in usages) for key in usages[0]}
+
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    path = os.path.join(tempfile.mkdtemp(prefix="pdf_inserter_rss_"), "source.pdf")
+    make_text_pdf(path, pages)
+    print(f"PyMuPDF {fitz.VersionBind}, {os.path.getsize(path) / 2**20:.1f} MB input")
+
+    print(f"{'mode':6} {'N':>2} {'total PSS MB':>13} {'total private MB':>17} "
+          f"{'RSS/worker MB':>14}")
+    for mode in ("bytes", "file", "mmap"):
+        for workers in WORKERS:
+            usage = measure(mode, path, workers)
+            if usage is None:
+                print(f"{mode:6} {workers:2} {'memoryview streams not supported':>46}")
+                break
+            print(f"{mode:6} {workers:2} {usage['Pss'] / 1024:13.1f} "
+                  f"{usage['Private'] / 1024:17.1f} "
+                  f"{usage['Rss'] / 1024 / workers:14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Compare I/O volume and latency of file-based and in-memory merges.
+
+Generates a Main and a Source PDF, then times the same job two ways, each
+in a fresh process so /proc/self/io (Linux only) counts only that job:
+
+  file    inputs and output are file paths, and the output is read back
+          as a pipeline uploading it would
+  memory  inputs are bytes already in memory (e.g. received from an
+          upload) and merge() returns the output as bytes
+
+Prints the best of a few runs: wall time, bytes read and written through
+system calls (rchar/wchar) and bytes that reached the block layer
+(read_bytes/write_bytes). PyMuPDF releases after the pinned 1.23.8 build
+bytes output through a Python callback per write, so there "memory" can
+take longer than "file" although it does no I/O.
+
+    python benchmarks/stream_output.py [pages]
+"""
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from estimate_accuracy import make_text_pdf  # noqa: E402
+from pdf_inserter import PDFMerger  # noqa: E402
+
+RUNS = 3
+RULES = [("Replace existing pages", [1], [1]),
+         ("Insert before position", [2, 3], [40, 40]),
+         ("Insert after position", [4], [100])]
+
+
+def io_counters():
+    with open("/proc/self/io") as counters:
+        return {key: int(value) for key, value in
+                (line.split(":") for line in counters)}
+
+
+def run_case(mode, main, source, output):
+    """Merge one job (runs in a fresh process); return seconds and I/O"""
+    if mode == "memory":
+        # The inputs are already in memory, loading them is not timed
+        with open(main, "rb") as main_file, open(source, "rb") as source_file:
+            main, source = main_file.read(), source_file.read()
+
+    before = io_counters()
+    started = time.perf_counter()
+    with PDFMerger(main, source) as merger:
+        if mode == "memory":
+            data = merger.merge(RULES)
+        else:
+            merger.merge(RULES, output)
+            with open(output, "rb") as output_file:
+                data = output_file.read()
+    seconds = time.perf_counter() - started
+    after = io_counters()
+    return seconds, len(data), {key: after[key] - before[key] for key in after}
+
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    directory = tempfile.mkdtemp(prefix="pdf_inserter_io_")
+    main_path = os.path.join(directory, "main.pdf")
+    source_path = os.path.join(directory, "source.pdf")
+    make_text_pdf(main_path, pages, 20)
+    make_text_pdf(source_path, 20, 50)
+    output = os.path.join(directory, "output.pdf")
+
+    print(f"{'mode':7} {'time s':>7} {'output MB':>10} {'read MB':>8} "
+          f"{'written MB':>11} {'disk read MB':>13} {'disk written MB':>16}")
+    for mode in ("file", "memory"):
+        runs = []
+        for _ in range(RUNS):
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                runs.append(pool.submit(
+                    run_case, mode, main_path, source_path, output).result())
+        seconds, size, io = min(runs, key=lambda run: run[0])
+        print(f"{mode:7} {seconds:7.2f} {size / 2**20:10.1f} "
+              f"{io['rchar'] / 2**20:8.1f} {io['wchar'] / 2**20:11.1f} "
+              f"{io['read_bytes'] / 2**20:13.1f} {io['write_bytes'] / 2**20:16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,12 @@
 import sys
 import os
+import re
+import math
+import time
+import shutil
+import hashlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from PyQt5.QtWidgets import *
 from PyQt5.QtCore import Qt, QUrl
 from PyQt5.QtGui import QDesktopServices, QFont, QIcon, QPalette, QColor
@@ -7,6 +14,1276 @@ import fitz  # PyMuPDF
 from pathlib import Path
 
 
+# Documents with fewer pages than this are indexed in-process; spinning up
+# worker processes costs more than extracting the text directly.
+PARALLEL_TEXT_MIN_PAGES = 64
+
+# Anchor expressions such as after:"Appendix B" or before:regex:^Section 4
+ANCHOR_PATTERN = re.compile(r'^(before|after):(regex:)?(.+)$', re.IGNORECASE)
+
+# Files whose page text index and page fingerprints are kept in memory,
+# least recently used first
+CACHED_FILES = 4
+
+# Source pages whose content streams (including Form XObjects) exceed this
+# many bytes are rasterized when heavy page rasterization is enabled
+RASTERIZE_THRESHOLD_KB = 1024
+RASTERIZE_DPI = 150
+
+# Cost model for dry-run estimates, fitted against timed merges of
+# generated documents (1k-10k pages, with and without dense links);
+# benchmarks/estimate_accuracy.py compares it with measured merges
+PAGE_WRAPPER_BYTES = 400            # new page + Form XObject per inserted page
+MEMORY_BASE_BYTES = 85 * 2**20      # interpreter, Qt and MuPDF baseline
+MEMORY_PER_OUTPUT_BYTE = 6.0        # parsed objects of inputs and output
+MEMORY_PER_PAGE = 5 * 2**10
+MEMORY_PER_LINK = 1536
+SECONDS_BASE = 0.05
+SECONDS_PER_MAIN_PAGE = 0.0004
+SECONDS_PER_SOURCE_PAGE = 0.002
+SECONDS_PER_MB = 0.05
+SECONDS_PER_LINK = 0.00013
+LINK_SAMPLE_PAGES = 64              # pages sampled to estimate link density
+RASTER_BYTES_PER_PIXEL = 0.6        # PNG size of rendered vector drawings
+SECONDS_RASTER_POOL = 0.3           # starting the rasterization workers
+SECONDS_PER_RASTER_MB = 0.5         # rendering a MB of page content
+SECONDS_PER_MEGAPIXEL = 0.25        # encoding, inserting and compressing images
+
+# Content stream tokens whose bytes are significant, including whitespace:
+# literal strings, hex strings and inline image data
+CONTENT_LITERALS = re.compile(rb'\(|<[0-9A-Fa-f\s]*>|\bID\s')
+INLINE_IMAGE_END = re.compile(rb'\sEI(?![^\s/\[\]<>()%])')
+
+# Indirect object references ("12 0 R") inside PDF object definitions
+XREF_REFERENCE = re.compile(r'(\d+) \d+ R')
+
+# Stream dictionary keys that describe the encoding rather than the content
+STREAM_ENCODING_KEYS = re.compile(r'/(Length|Filter|DecodeParms)\s*(\[[^\]]*\]|<<.*?>>|/\w+|\d+ \d+ R|\d+)', re.DOTALL)
+
+
+def file_identity(path):
+    """Identify a file version by real path, size and modification time"""
+    stat = os.stat(path)
+    return (os.path.realpath(path), stat.st_size, stat.st_mtime_ns)
+
+
+def read_input(source):
+    """Normalize a PDF input to a file path or bytes.
+
+    Buffers are copied to bytes once here, so they can be handed to
+    fitz and to worker processes (memoryview cannot be pickled).
+    """
+    if isinstance(source, os.PathLike):
+        return os.fspath(source)
+    if isinstance(source, str):
+        return source
+    if hasattr(source, "read"):
+        source = source.read()
+    return bytes(source)
+
+
+def open_input(source):
+    """Open a PDF given as a file path or bytes"""
+    if isinstance(source, str):
+        return fitz.open(source)
+    return fitz.open(stream=source, filetype="pdf")
+
+
+def input_size(source):
+    """Size in bytes of a PDF given as a file path or bytes"""
+    if isinstance(source, str):
+        return os.path.getsize(source)
+    return len(source)
+
+
+def page_complexity(doc, page_idx):
+    """Decoded size of a page's content streams and Form XObjects"""
+    page = doc[page_idx]
+    size = len(page.read_contents())
+    for xobject in page.get_xobjects():
+        size += len(doc.xref_stream(xobject[0]) or b"")
+    return size
+
+
+# Source PDF of a rasterization worker process, see open_worker_source
+worker_source = None
+
+
+def open_worker_source(source):
+    """Open the source PDF once per worker process (pool initializer).
+
+    The path or bytes are sent to each worker once instead of with every
+    page task.
+    """
+    global worker_source
+    worker_source = open_input(source)
+
+
+def rasterize_page(page_idx, dpi, text_layer):
+    """Render a page of the worker's source PDF to PNG (runs in a worker).
+
+    Returns the PNG bytes, the page rectangle, the page words for an
+    invisible text layer, the time taken to render the original page and
+    the image page at dpi, and the page rotation matrix. Words are in
+    unrotated page coordinates; the rotation matrix maps them onto the
+    image.
+    """
+    page = worker_source[page_idx]
+    started = time.perf_counter()
+    pixmap = page.get_pixmap(dpi=dpi, alpha=False)
+    vector_seconds = time.perf_counter() - started
+    image = pixmap.tobytes("png")
+    words = page.get_text("words") if text_layer else []
+    rect = page.rect
+
+    image_doc = fitz.open()
+    image_page = image_doc.new_page(width=rect.width, height=rect.height)
+    image_page.insert_image(image_page.rect, stream=image)
+    started = time.perf_counter()
+    image_page.get_pixmap(dpi=dpi, alpha=False)
+    image_seconds = time.perf_counter() - started
+    image_doc.close()
+
+    return image, tuple(rect), [tuple(word[:5]) for word in words], \
+        vector_seconds, image_seconds, tuple(page.rotation_matrix)
+
+
+def extract_page_texts(path, start, stop):
+    """Extract the text of pages [start, stop) of a PDF (runs in a worker)"""
+    doc = fitz.open(path)
+    try:
+        return [doc[i].get_text() for i in range(start, stop)]
+    finally:
+        doc.close()
+
+
+class PageTextIndex:
+    """Text of every page of a PDF, used to resolve text anchors.
+
+    Only one copy of the text is kept: every line with its whitespace
+    collapsed, so plain anchors can match across line breaks and regex
+    anchors can still use ^ and $.
+    """
+
+    # realpath -> (file identity, index) for the CACHED_FILES most
+    # recently used files; an entry is rebuilt when its file changes
+    _cache = OrderedDict()
+
+    def __init__(self, texts):
+        self.texts = ["\n".join(" ".join(line.split())
+                                for line in text.splitlines() if line.strip())
+                      for text in texts]
+
+    @classmethod
+    def for_document(cls, doc):
+        """Build an uncached index from an open document"""
+        return cls([page.get_text() for page in doc])
+
+    @classmethod
+    def for_file(cls, path):
+        """Return the cached index for path, building it if the file changed"""
+        identity = file_identity(path)
+        cached = cls._cache.get(identity[0])
+        if cached and cached[0] == identity:
+            cls._cache.move_to_end(identity[0])
+            return cached[1]
+
+        doc = fitz.open(path)
+        page_count = doc.page_count
+        doc.close()
+
+        if page_count < PARALLEL_TEXT_MIN_PAGES:
+            texts = extract_page_texts(path, 0, page_count)
+        else:
+            workers = min(os.cpu_count() or 1, 8)
+            chunk = -(-page_count // workers)
+            bounds = [(start, min(start + chunk, page_count))
+                      for start in range(0, page_count, chunk)]
+            texts = []
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(extract_page_texts, path, start, stop)
+                           for start, stop in bounds]
+                for future in futures:
+                    texts.extend(future.result())
+
+        index = cls(texts)
+        cls._cache[identity[0]] = (identity, index)
+        cls._cache.move_to_end(identity[0])
+        while len(cls._cache) > CACHED_FILES:
+            cls._cache.popitem(last=False)
+        return index
+
+    def find(self, needle, regex=False):
+        """Return the 0-based index of the first page matching needle"""
+        if regex:
+            pattern = re.compile(needle, re.MULTILINE)
+            for i, text in enumerate(self.texts):
+                if pattern.search(text):
+                    return i
+        else:
+            needle = " ".join(needle.split())
+            for i, text in enumerate(self.texts):
+                if needle in text.replace("\n", " "):
+                    return i
+        return None
+
+
+def page_xrefs(doc):
+    """Return the xref of every page in order, walking the page tree once"""
+    xrefs = []
+    kind, value = doc.xref_get_key(doc.pdf_catalog(), "Pages")
+    stack = [int(value.split()[0])]
+    while stack:
+        xref = stack.pop()
+        kind, kids = doc.xref_get_key(xref, "Kids")
+        if kind == "array":
+            # Push children in reverse so they are visited in order
+            stack.extend(int(kid) for kid in reversed(
+                XREF_REFERENCE.findall(kids)))
+        else:
+            xrefs.append(xref)
+    return xrefs
+
+
+# Delimiters ending a PDF name or number token
+PDF_DELIMITERS = set("()<>[]{}/% \t\r\n\f\0")
+PDF_REFERENCE = re.compile(r'\d+\s+\d+\s+R(?![^\s()<>\[\]{}/%])')
+PDF_ESCAPES = {"n": b"\n", "r": b"\r", "t": b"\t", "b": b"\b", "f": b"\f"}
+
+
+def pdf_object_end(text, pos):
+    """Return the index just past the PDF object starting at pos"""
+    char = text[pos]
+    if char == "(":
+        depth = 0
+        while pos < len(text):
+            if text[pos] == "\\":
+                pos += 1
+            elif text[pos] == "(":
+                depth += 1
+            elif text[pos] == ")":
+                depth -= 1
+                if not depth:
+                    return pos + 1
+            pos += 1
+        return pos
+    if text.startswith("<<", pos) or char == "[":
+        closing = ">>" if char == "<" else "]"
+        pos += len(closing)
+        while pos < len(text) and not text.startswith(closing, pos):
+            if text[pos].isspace():
+                pos += 1
+            else:
+                pos = pdf_object_end(text, pos)
+        return pos + len(closing)
+    if char == "<":
+        return text.index(">", pos) + 1
+    pos += 1
+    while pos < len(text) and text[pos] not in PDF_DELIMITERS:
+        pos += 1
+    return pos
+
+
+def pdf_items(text):
+    """Split a PDF array or dictionary into the source text of its items"""
+    text = text.strip()
+    closing = "]" if text.startswith("[") else ">>"
+    items = []
+    pos = 1 if closing == "]" else 2
+    while pos < len(text) and not text.startswith(closing, pos):
+        if text[pos].isspace():
+            pos += 1
+        else:
+            reference = PDF_REFERENCE.match(text, pos)
+            end = reference.end() if reference else pdf_object_end(text, pos)
+            items.append(text[pos:end])
+            pos = end
+    return items
+
+
+def pdf_dict(text):
+    """Map the keys of a PDF dictionary to the source text of its values"""
+    items = pdf_items(text)
+    return dict(zip(items[0::2], items[1::2]))
+
+
+def pdf_resolve(doc, text):
+    """Return the definition of an indirect reference, other text as is"""
+    if PDF_REFERENCE.fullmatch(text.strip()):
+        return doc.xref_object(int(text.split()[0]), compressed=True)
+    return text
+
+
+def pdf_string_value(token):
+    """Decode a PDF name, literal string or hex string token"""
+    if token.startswith("/"):
+        return re.sub(r'#([0-9A-Fa-f]{2})',
+                      lambda match: chr(int(match.group(1), 16)), token[1:])
+    if token.startswith("<"):
+        hex_digits = re.sub(r'\s', '', token[1:-1])
+        data = bytes.fromhex(hex_digits + "0" * (len(hex_digits) % 2))
+    else:
+        data = bytearray()
+        escape = re.compile(r'\\(?:([0-7]{1,3})|(\r\n|\r|\n)|(.))', re.DOTALL)
+        pos = 1
+        for match in escape.finditer(token, 1, len(token) - 1):
+            data += token[pos:match.start()].encode("latin-1")
+            if match.group(1):
+                data.append(int(match.group(1), 8) & 0xFF)
+            elif match.group(3):
+                data += PDF_ESCAPES.get(match.group(3),
+                                        match.group(3).encode("latin-1"))
+            pos = match.end()
+        data += token[pos:-1].encode("latin-1")
+        data = bytes(data)
+    if data.startswith(b"\xfe\xff"):
+        return data[2:].decode("utf-16-be", "replace")
+    return data.decode("latin-1")
+
+
+def pdf_inline(doc, text, depth=8):
+    """Replace indirect references in text by the objects they point to.
+
+    Returns None if a referenced object is a stream or the references
+    nest deeper than depth, which cannot be written inline.
+    """
+    if not depth:
+        return None
+    parts = []
+    pos = 0
+    for match in XREF_REFERENCE.finditer(text):
+        xref = int(match.group(1))
+        if not 0 < xref < doc.xref_length() or doc.xref_is_stream(xref):
+            return None
+        inlined = pdf_inline(
+            doc, doc.xref_object(xref, compressed=True), depth - 1)
+        if inlined is None:
+            return None
+        parts.extend((text[pos:match.start()], inlined))
+        pos = match.end()
+    return "".join(parts) + text[pos:]
+
+
+def named_destinations(doc):
+    """Map named destinations to their explicit destination arrays.
+
+    Covers both the /Dests dictionary of the catalog and the /Dests name
+    tree, walking each once.
+    """
+    destinations = {}
+    catalog = doc.pdf_catalog()
+
+    entries = []
+    kind, value = doc.xref_get_key(catalog, "Dests")
+    if kind in ("dict", "xref"):
+        entries.extend(pdf_dict(pdf_resolve(doc, value)).items())
+
+    kind, value = doc.xref_get_key(catalog, "Names/Dests")
+    stack = [value] if kind in ("dict", "xref") else []
+    while stack:
+        node = pdf_dict(pdf_resolve(doc, stack.pop()))
+        if "/Kids" in node:
+            stack.extend(pdf_items(pdf_resolve(doc, node["/Kids"])))
+        if "/Names" in node:
+            names = pdf_items(pdf_resolve(doc, node["/Names"]))
+            entries.extend(zip(names[0::2], names[1::2]))
+
+    for name, dest in entries:
+        dest = pdf_resolve(doc, dest).strip()
+        if dest.startswith("<<"):
+            dest = pdf_resolve(doc, pdf_dict(dest).get("/D", "[]"))
+        destinations.setdefault(pdf_string_value(name), dest)
+    return destinations
+
+
+def format_bytes(size):
+    """Format a byte count for display, e.g. 12.3 MB"""
+    for unit in ("bytes", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "bytes" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def object_bytes(doc, text, seen):
+    """Sum the stored size of the objects referenced from text.
+
+    Objects already in seen are skipped, so shared resources count once.
+    /Parent references are not followed to stay out of the page tree.
+    """
+    total = 0
+    for match in XREF_REFERENCE.finditer(re.sub(r'/Parent\s+\d+ \d+ R', '', text)):
+        xref = int(match.group(1))
+        if xref in seen or not 0 < xref < doc.xref_length():
+            continue
+        seen.add(xref)
+        definition = doc.xref_object(xref, compressed=True)
+        total += len(definition)
+        if doc.xref_is_stream(xref):
+            kind, length = doc.xref_get_key(xref, "Length")
+            if kind == "xref":
+                length = doc.xref_object(int(length.split()[0]))
+            total += int(length) if length.strip().isdigit() else 0
+        total += object_bytes(doc, definition, seen)
+    return total
+
+
+def page_bytes(doc, page_idx, seen):
+    """Stored size of a page's content streams and resources"""
+    page_xref = doc.page_xref(page_idx)
+    total = 0
+    for key in ("Contents", "Resources"):
+        kind, value = doc.xref_get_key(page_xref, key)
+        if kind == "xref":
+            total += object_bytes(doc, value, seen)
+        elif kind in ("array", "dict"):
+            total += len(value) + object_bytes(doc, value, seen)
+    return total
+
+
+def literal_string_end(data, pos):
+    """Return the index just past the literal string starting at pos"""
+    depth = 0
+    while pos < len(data):
+        char = data[pos]
+        if char == 0x5C:  # backslash escapes the next byte
+            pos += 1
+        elif char == 0x28:
+            depth += 1
+        elif char == 0x29:
+            depth -= 1
+            if not depth:
+                return pos + 1
+        pos += 1
+    return pos
+
+
+def normalize_content(data):
+    """Collapse whitespace between the tokens of a content stream.
+
+    Literal and hex strings and inline image data are kept byte for byte:
+    their whitespace is glyph codes or pixels, not layout. Whitespace
+    around them is optional, so they are always joined by one space.
+    """
+    parts = []
+    pos = 0
+    while True:
+        match = CONTENT_LITERALS.search(data, pos)
+        end = match.start() if match else len(data)
+        parts.append(b" ".join(data[pos:end].split()))
+        if not match:
+            break
+        token = match.group()
+        if token == b"(":
+            pos = literal_string_end(data, match.start())
+        elif token.startswith(b"<"):
+            pos = match.end()
+        else:
+            image_end = INLINE_IMAGE_END.search(data, match.end())
+            pos = image_end.end() if image_end else len(data)
+        parts.append(data[end:pos])
+    return b" ".join(part for part in parts if part)
+
+
+class PageFingerprints:
+    """Content hashes of PDF pages, comparable across documents.
+
+    A fingerprint covers the page size and rotation, the whitespace
+    normalized content streams and every object reachable from the page
+    resources, with object numbers replaced by the hash of the object they
+    point to. Only the digests are kept; the document is passed to every
+    call, so cached fingerprints never hold on to a closed document.
+    """
+
+    # realpath -> (file identity, fingerprints) for the CACHED_FILES most
+    # recently used files
+    _cache = OrderedDict()
+
+    def __init__(self):
+        self.pages = {}
+        self.objects = {}
+
+    @classmethod
+    def for_file(cls, path):
+        """Return the cached fingerprints for the file at path.
+
+        Documents without a path (opened from memory) are not cached.
+        """
+        if path is None:
+            return cls()
+
+        identity = file_identity(path)
+        cached = cls._cache.get(identity[0])
+        if cached and cached[0] == identity:
+            cls._cache.move_to_end(identity[0])
+            return cached[1]
+
+        fingerprints = cls()
+        cls._cache[identity[0]] = (identity, fingerprints)
+        cls._cache.move_to_end(identity[0])
+        while len(cls._cache) > CACHED_FILES:
+            cls._cache.popitem(last=False)
+        return fingerprints
+
+    def page(self, doc, page_idx):
+        """Return the fingerprint of a page (0-based), computing it once"""
+        if page_idx not in self.pages:
+            page = doc[page_idx]
+            digest = hashlib.sha1()
+            digest.update(f"{page.rect}|{page.rotation}|".encode())
+            digest.update(normalize_content(page.read_contents()))
+            digest.update(self.resources_digest(doc, page.xref).encode())
+            self.pages[page_idx] = digest.hexdigest()
+        return self.pages[page_idx]
+
+    def all_pages(self, doc):
+        """Return the fingerprints of every page in the document"""
+        return [self.page(doc, i) for i in range(doc.page_count)]
+
+    def resources_digest(self, doc, page_xref):
+        """Digest the page resources, following inherited /Resources"""
+        xref = page_xref
+        while xref:
+            kind, value = doc.xref_get_key(xref, "Resources")
+            if kind != "null":
+                return self.expand_references(doc, value, set())[0]
+            kind, value = doc.xref_get_key(xref, "Parent")
+            xref = int(value.split()[0]) if kind == "xref" else 0
+        return ""
+
+    def expand_references(self, doc, text, visiting):
+        """Replace references in text by object digests.
+
+        Returns the text and whether it is free of reference cycles.
+        """
+        complete = True
+
+        def digest(match):
+            nonlocal complete
+            value, acyclic = self.object_digest(
+                doc, int(match.group(1)), visiting)
+            complete = complete and acyclic
+            return value
+
+        return XREF_REFERENCE.sub(digest, text), complete
+
+    def object_digest(self, doc, xref, visiting):
+        """Return the digest of an object and whether it is cycle free.
+
+        visiting holds the objects on the current reference path. Digests
+        that went through a cycle depend on where the cycle was entered,
+        so only cycle free digests are cached.
+        """
+        if xref in self.objects:
+            return self.objects[xref], True
+        if xref in visiting:
+            return "cycle", False
+
+        visiting.add(xref)
+        definition = doc.xref_object(xref, compressed=True)
+        digest = hashlib.sha1()
+        if doc.xref_is_stream(xref):
+            definition = STREAM_ENCODING_KEYS.sub("", definition)
+            digest.update(doc.xref_stream(xref) or b"")
+        definition, complete = self.expand_references(
+            doc, definition, visiting)
+        digest.update(definition.encode())
+        visiting.discard(xref)
+
+        if complete:
+            self.objects[xref] = digest.hexdigest()
+        return digest.hexdigest(), complete
+
+
+def parse_page_range(page_str, max_pages, allow_all=False):
+    """Parse page range string like '1-5,7,9-12' or 'all'"""
+    if not page_str:
+        return [] if not allow_all else list(range(1, max_pages + 1))
+
+    if page_str.lower() == 'all':
+        return list(range(1, max_pages + 1))
+
+    pages = set()
+    parts = page_str.split(',')
+
+    for part in parts:
+        part = part.strip()
+        if '-' in part:
+            start, end = part.split('-')
+            try:
+                start_page = max(1, int(start))
+                end_page = min(max_pages, int(end))
+                if start_page <= end_page:
+                    pages.update(range(start_page, end_page + 1))
+            except ValueError:
+                continue
+        else:
+            try:
+                page = int(part)
+                if 1 <= page <= max_pages:
+                    pages.add(page)
+            except ValueError:
+                continue
+
+    return sorted(list(pages))
+
+
+class PDFMerger:
+    """Merge engine: plans a job and assembles its output.
+
+    main and source are file paths or in-memory PDFs (bytes, bytearray,
+    memoryview or a readable file object). Rules are parsed
+    (mode, PDF2 pages, PDF1 positions) tuples with 1-based page numbers,
+    as produced by parse_rule.
+    """
+
+    def __init__(self, main, source):
+        self.main = read_input(main)
+        self.source = read_input(source)
+        # File paths key the fingerprint caches, buffers are not cached
+        self.main_path = self.main if isinstance(self.main, str) else None
+        self.source_path = self.source if isinstance(
+            self.source, str) else None
+        self.pdf1 = open_input(self.main)   # Main PDF
+        self.pdf2 = open_input(self.source)  # Source PDF
+        self.main_text_index = None  # Anchor text of an in-memory Main PDF
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.pdf1.close()
+        self.pdf2.close()
+
+    def parse_rule(self, rule):
+        """Parse a rule into (mode, PDF2 pages, PDF1 positions), 1-based"""
+        pdf2_pages = parse_page_range(
+            rule["pages"], self.pdf2.page_count, allow_all=True)
+
+        if rule["mode"] == "Append at end":
+            pdf1_positions = [self.pdf1.page_count + 1] * len(pdf2_pages)
+        else:
+            pdf1_positions = self.parse_positions(
+                rule["positions"], rule["mode"])
+
+        return rule["mode"], pdf2_pages, pdf1_positions
+
+    def parse_positions(self, positions_str, mode="Insert before position"):
+        """Parse positions string, handle 'mid', 'end' and text anchors"""
+        if not positions_str:
+            return []
+
+        max_pages = self.pdf1.page_count
+        positions = []
+        # Split on commas outside quotes so anchor text may contain commas
+        parts = re.findall(r'(?:[^,"]|"[^"]*")+', positions_str)
+
+        for part in parts:
+            part = part.strip()
+
+            anchor = ANCHOR_PATTERN.match(part)
+            if anchor:
+                positions.append(self.resolve_anchor(
+                    anchor.group(1).lower(), anchor.group(3),
+                    bool(anchor.group(2)), mode))
+                continue
+
+            part = part.lower()
+
+            if part == 'mid':
+                # Insert at middle position
+                mid_pos = max_pages // 2 + 1
+                positions.append(mid_pos)
+            elif part == 'end':
+                # Append at end
+                positions.append(max_pages + 1)
+            elif '-' in part:
+                # Range of positions
+                start, end = part.split('-')
+                try:
+                    start_pos = max(1, int(start))
+                    end_pos = min(max_pages + 1, int(end))
+                    if start_pos <= end_pos:
+                        positions.extend(range(start_pos, end_pos + 1))
+                except ValueError:
+                    continue
+            else:
+                # Single position
+                try:
+                    pos = int(part)
+                    if 1 <= pos <= max_pages + 1:
+                        positions.append(pos)
+                except ValueError:
+                    continue
+
+        return positions
+
+    def resolve_anchor(self, side, expression, regex=False,
+                       mode="Insert before position"):
+        """Resolve a text anchor to a 1-based position in the Main PDF.
+
+        The anchor names the gap before or after the first page containing
+        the text: "Insert before position" takes the page following the
+        gap, "Insert after position" the page preceding it. In "Replace
+        existing pages" mode the anchor names the matching page itself.
+        """
+        expression = expression.strip()
+        if len(expression) >= 2 and expression[0] == expression[-1] == '"':
+            expression = expression[1:-1]
+
+        index = self.text_index()
+        page_idx = index.find(expression, regex=regex)
+        if page_idx is None:
+            raise ValueError(
+                f"No page in Main PDF matches anchor '{expression}'")
+
+        page = page_idx + 1
+        if mode == "Replace existing pages":
+            return page
+
+        # Gap before the matching page lies between pages page-1 and page
+        gap = page if side == 'before' else page + 1
+        position = gap - 1 if mode == "Insert after position" else gap
+
+        max_pages = self.pdf1.page_count
+        last = max_pages if mode == "Insert after position" else max_pages + 1
+        if not 1 <= position <= last:
+            raise ValueError(
+                f"Anchor '{side}:{expression}' matches PDF1 page {page}, "
+                f"which leaves no PDF1 position to {mode.lower()}")
+        return position
+
+    def text_index(self):
+        """Return the page text index of the Main PDF.
+
+        File inputs share the cached index of their file; the index of an
+        in-memory Main PDF is built from the open document on first use.
+        """
+        if self.main_path:
+            return PageTextIndex.for_file(self.main_path)
+        if self.main_text_index is None:
+            self.main_text_index = PageTextIndex.for_document(self.pdf1)
+        return self.main_text_index
+
+    def resize_page_to_match(self, source_page, target_page_size, target_doc):
+        """Append source page to target_doc, scaled to the target page size"""
+        target_rect = fitz.Rect(
+            0, 0, target_page_size.width, target_page_size.height)
+
+        # Create a new blank page with target size
+        new_page = target_doc.new_page(
+            width=target_rect.width, height=target_rect.height)
+
+        # Scale the source page into the new page, keeping the aspect ratio
+        # and centering it
+        new_page.show_pdf_page(
+            target_rect,
+            source_page.parent,
+            source_page.number
+        )
+
+        return new_page
+
+    def build_plan(self, parsed_rules):
+        """Resolve parsed rules into the ordered pages of the output.
+
+        Every rule is interpreted against the original PDF1 page numbers.
+        Insert rules without positions insert nothing.
+        Each entry is ("main", pdf1_page_idx) for a kept PDF1 page or
+        ("source", pdf2_page_idx, size_page_idx, replaced_page_idx) for a
+        PDF2 page resized to match PDF1 page size_page_idx (None for A4);
+        replaced_page_idx is None for insertions.
+        """
+        page_count = self.pdf1.page_count
+        standard_idx = 0 if page_count > 0 else None
+
+        before = {}
+        after = {}
+        replacements = {}
+        appended = []
+
+        pdf1_fingerprints = PageFingerprints.for_file(self.main_path)
+        pdf2_fingerprints = PageFingerprints.for_file(self.source_path)
+
+        for mode, pdf2_pages, pdf1_positions in parsed_rules:
+            # Adjust for 0-based indexing
+            pdf2_pages_idx = [p - 1 for p in pdf2_pages]
+            pdf1_positions_idx = [p - 1 for p in pdf1_positions]
+
+            if mode == "Append at end":
+                appended.extend(pdf2_pages_idx)
+                continue
+
+            if mode == "Replace existing pages":
+                for pos_idx, page_idx in zip(pdf1_positions_idx, pdf2_pages_idx):
+                    if pos_idx < page_count:
+                        replacements.setdefault(pos_idx, page_idx)
+                continue
+
+            # Nowhere to insert; callers report such rules before planning
+            if not pdf1_positions_idx:
+                continue
+
+            # Extra pages go to the last position, in order
+            if len(pdf1_positions_idx) < len(pdf2_pages_idx):
+                pdf1_positions_idx = pdf1_positions_idx + \
+                    [pdf1_positions_idx[-1]] * (len(pdf2_pages_idx) -
+                                                len(pdf1_positions_idx))
+
+            targets = before if mode == "Insert before position" else after
+            for pos_idx, page_idx in zip(pdf1_positions_idx, pdf2_pages_idx):
+                targets.setdefault(pos_idx, []).append(page_idx)
+
+        plan = []
+        for i in range(page_count + 1):
+            plan.extend(("source", page_idx, standard_idx, None)
+                        for page_idx in before.get(i, []))
+            if i < page_count:
+                page_idx = replacements.get(i)
+                # Identical content: keep the original page, no resize needed
+                if page_idx is None or pdf1_fingerprints.page(self.pdf1, i) == pdf2_fingerprints.page(self.pdf2, page_idx):
+                    plan.append(("main", i))
+                else:
+                    plan.append(("source", page_idx, i, i))
+            plan.extend(("source", page_idx, standard_idx, None)
+                        for page_idx in after.get(i, []))
+
+        plan.extend(("source", page_idx, standard_idx, None)
+                    for page_idx in appended)
+        return plan
+
+    def find_heavy_pages(self, plan, threshold):
+        """Return {PDF2 page index: content bytes} of pages to rasterize"""
+        heavy_pages = {}
+        for page_idx in {entry[1] for entry in plan if entry[0] == "source"}:
+            size = page_complexity(self.pdf2, page_idx)
+            if size > threshold:
+                heavy_pages[page_idx] = size
+        return heavy_pages
+
+    def rasterize_pages(self, page_indices, dpi, text_layer):
+        """Rasterize PDF2 pages in a process pool, keyed by page index"""
+        workers = min(os.cpu_count() or 1, len(page_indices), 8)
+
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=open_worker_source,
+                                 initargs=(self.source,)) as pool:
+            futures = {page_idx: pool.submit(
+                rasterize_page, page_idx, dpi, text_layer)
+                for page_idx in page_indices}
+            return {page_idx: future.result()
+                    for page_idx, future in futures.items()}
+
+    def insert_rasterized_page(self, rasterized, target_page_size, target_doc):
+        """Append a rasterized page, scaled like resize_page_to_match"""
+        image, source_rect, words, _, _, rotation = rasterized
+        source_rect = fitz.Rect(source_rect)
+        target_rect = fitz.Rect(
+            0, 0, target_page_size.width, target_page_size.height)
+
+        new_page = target_doc.new_page(
+            width=target_rect.width, height=target_rect.height)
+        new_page.insert_image(target_rect, stream=image)
+
+        if words:
+            # Map unrotated source positions onto the image: source
+            # rotation, then the same fit-and-center placement as the image
+            scale = min(target_rect.width / source_rect.width,
+                        target_rect.height / source_rect.height)
+            placement = fitz.Matrix(rotation) * fitz.Matrix(scale, scale) * \
+                fitz.Matrix(1, 0, 0, 1,
+                            (target_rect.width - source_rect.width * scale) / 2,
+                            (target_rect.height - source_rect.height * scale) / 2)
+            # Shape rotates text counterclockwise, page rotation is clockwise
+            angle = -round(math.degrees(math.atan2(rotation[1], rotation[0]))) % 360
+
+            # One shape commits all words as a single content stream
+            shape = new_page.new_shape()
+            for x0, y0, x1, y1, word in words:
+                height = (y1 - y0) * scale
+                # The trailing space keeps words apart in extracted text
+                shape.insert_text(
+                    fitz.Point(x0, y1 - (y1 - y0) * 0.2) * placement,
+                    word + " ", fontsize=max(height * 0.8, 1),
+                    rotate=angle, render_mode=3)
+            shape.commit()
+
+        return new_page
+
+    def execute_plan(self, plan, rasterized=None, progress=None):
+        """Assemble the output document described by plan.
+
+        PDF2 pages with an entry in rasterized are inserted as images.
+        progress, if given, is called with the percentage done.
+        """
+        rasterized = rasterized or {}
+        merged_pdf = fitz.open()
+
+        i = 0
+        while i < len(plan):
+            entry = plan[i]
+            if entry[0] == "main":
+                # Copy runs of consecutive PDF1 pages with a single call
+                start = end = entry[1]
+                while i + 1 < len(plan) and plan[i + 1] == ("main", end + 1):
+                    i += 1
+                    end += 1
+                # Links are rewritten afterwards by remap_links
+                merged_pdf.insert_pdf(
+                    self.pdf1, from_page=start, to_page=end, links=False)
+            else:
+                _, page_idx, size_idx, _ = entry
+                target_size = self.pdf1[size_idx].rect if size_idx is not None else fitz.Rect(
+                    0, 0, 595, 842)  # A4 default
+                if page_idx in rasterized:
+                    self.insert_rasterized_page(
+                        rasterized[page_idx], target_size, merged_pdf)
+                else:
+                    self.resize_page_to_match(
+                        self.pdf2[page_idx], target_size, merged_pdf)
+
+            i += 1
+            if progress:
+                progress(int(i * 100 / len(plan)))
+
+        self.remap_links(plan, merged_pdf)
+        return merged_pdf
+
+    def page_index_map(self, plan):
+        """Map each PDF1 page index to its index in the output.
+
+        A replaced page maps to its replacement, so links and bookmarks
+        pointing at it land on the new content.
+        """
+        page_map = {}
+        for new_idx, entry in enumerate(plan):
+            if entry[0] == "main":
+                page_map[entry[1]] = new_idx
+            elif entry[3] is not None:
+                page_map[entry[3]] = new_idx
+        return page_map
+
+    def link_destination(self, xref):
+        """Return the (kind, value) destination of a PDF1 link or bookmark.
+
+        kind is "null" for other actions (URI, launch, remote GoTo...).
+        """
+        kind, dest = self.pdf1.xref_get_key(xref, "Dest")
+        if kind == "null" and self.pdf1.xref_get_key(xref, "A/S")[1] == "/GoTo":
+            kind, dest = self.pdf1.xref_get_key(xref, "A/D")
+        return kind, dest
+
+    def remap_links(self, plan, merged_pdf):
+        """Carry PDF1 links and outline into the output in one pass.
+
+        Internal GoTo links, links to named destinations and bookmarks are
+        rewritten through the old->new page map; named destinations are
+        resolved once and written as explicit page targets. Destinations
+        and link rectangles are copied from their PDF objects, so they keep
+        their original (unrotated) coordinates and only the page reference
+        changes. Link annotations are written directly against a
+        precomputed table of output page xrefs, because Page.insert_link
+        looks up the target page xref by walking the page tree for every
+        link.
+        """
+        page_map = self.page_index_map(plan)
+        output_xrefs = page_xrefs(merged_pdf)
+        source_xrefs = page_xrefs(self.pdf1)
+        source_pages = {xref: idx for idx, xref in enumerate(source_xrefs)}
+        named_dests = None
+
+        def remap_destination(kind, dest):
+            """Rewrite a PDF1 destination for the output, None to drop it"""
+            nonlocal named_dests
+            if kind in ("name", "string"):
+                if named_dests is None:
+                    named_dests = named_destinations(self.pdf1)
+                dest = named_dests.get(
+                    pdf_string_value(dest) if kind == "name" else dest, "[]")
+            items = pdf_items(pdf_resolve(self.pdf1, dest))
+            if not items or not PDF_REFERENCE.fullmatch(items[0]):
+                return None
+            page_idx = source_pages.get(int(items[0].split()[0]))
+            if page_idx not in page_map:
+                return None
+            target_idx = page_map[page_idx]
+            target_xref = output_xrefs[target_idx]
+            if plan[target_idx][0] == "main":
+                return f"[{target_xref} 0 R {' '.join(items[1:])}]"
+            # The target was replaced, show the whole new page
+            return f"[{target_xref} 0 R/Fit]"
+
+        for new_idx, entry in enumerate(plan):
+            if entry[0] != "main":
+                continue
+
+            kind, value = self.pdf1.xref_get_key(
+                source_xrefs[entry[1]], "Annots")
+            if kind not in ("array", "xref"):
+                continue
+
+            annots = []
+            fallback_xrefs = set()
+            for annot_xref in XREF_REFERENCE.findall(pdf_resolve(self.pdf1, value)):
+                annot_xref = int(annot_xref)
+                if self.pdf1.xref_get_key(annot_xref, "Subtype")[1] != "/Link":
+                    continue
+
+                kind, dest = self.link_destination(annot_xref)
+                if kind != "null":
+                    dest = remap_destination(kind, dest)
+                    if dest is None:
+                        continue
+                    action = f"/Dest{dest}"
+                else:
+                    # URI, launch, remote GoTo and other actions do not
+                    # depend on page numbers and are copied as they are
+                    action = pdf_inline(self.pdf1, pdf_resolve(
+                        self.pdf1, self.pdf1.xref_get_key(annot_xref, "A")[1]))
+                    if action is None:
+                        fallback_xrefs.add(annot_xref)
+                        continue
+                    action = f"/A{action}"
+
+                rect = pdf_resolve(
+                    self.pdf1, self.pdf1.xref_get_key(annot_xref, "Rect")[1])
+                xref = merged_pdf.get_new_xref()
+                merged_pdf.update_object(
+                    xref,
+                    f"<</Type/Annot/Subtype/Link/Border[0 0 0]/Rect{rect}{action}>>")
+                annots.append(f"{xref} 0 R")
+
+            if annots:
+                page_xref = output_xrefs[new_idx]
+                kind, value = merged_pdf.xref_get_key(page_xref, "Annots")
+                existing = pdf_resolve(merged_pdf, value).strip()[1:-1] if kind in (
+                    "array", "xref") else ""
+                merged_pdf.xref_set_key(
+                    page_xref, "Annots", f"[{existing} {' '.join(annots)}]")
+
+            if fallback_xrefs:
+                # Actions referring to streams (e.g. embedded files);
+                # get_links reports rectangles in rotated page space
+                source_page = self.pdf1[entry[1]]
+                merged_page = merged_pdf[new_idx]
+                for link in source_page.get_links():
+                    if link.get("xref") in fallback_xrefs:
+                        link["from"] = link["from"] * source_page.derotation_matrix
+                        merged_page.insert_link(link)
+
+        toc = self.pdf1.get_toc(simple=False)
+        if toc:
+            for item in toc:
+                if item[2] > 0:
+                    item[2] = page_map.get(item[2] - 1, -1) + 1
+                if len(item) > 3 and isinstance(item[3], dict):
+                    item[3]["page"] = item[2] - 1
+                    if item[3].get("kind") == fitz.LINK_NAMED:
+                        item[3]["kind"] = fitz.LINK_GOTO
+            merged_pdf.set_toc(toc)
+
+            # set_toc converts bookmark targets through rotated page space
+            # on some PyMuPDF versions; copy the original destinations
+            for item, merged_item in zip(toc, merged_pdf.get_toc(simple=False)):
+                source_xref = item[3].get("xref", 0) if len(item) > 3 else 0
+                merged_xref = merged_item[3].get("xref", 0) if len(merged_item) > 3 else 0
+                if not source_xref or not merged_xref:
+                    continue
+                kind, dest = self.link_destination(source_xref)
+                dest = remap_destination(kind, dest) if kind != "null" else None
+                if dest is not None:
+                    if merged_pdf.xref_get_key(merged_xref, "Dest")[0] != "null":
+                        merged_pdf.xref_set_key(merged_xref, "Dest", "null")
+                    merged_pdf.xref_set_key(
+                        merged_xref, "A", f"<</S/GoTo/D{dest}>>")
+
+    def estimate_cost(self, plan, rasterize_threshold=None, dpi=RASTERIZE_DPI):
+        """Estimate output size, peak memory and run time without merging.
+
+        Only the replaced PDF1 pages and the inserted PDF2 pages are
+        inspected; the rest of PDF1 is costed from its file size. With a
+        rasterize_threshold, heavy source pages (see find_heavy_pages) are
+        costed as images at dpi, and returned under "heavy_pages".
+        """
+        pdf1_size = input_size(self.main)
+
+        main_pages = sum(1 for entry in plan if entry[0] == "main")
+        source_entries = [entry for entry in plan if entry[0] == "source"]
+
+        heavy_pages = {}
+        if rasterize_threshold is not None:
+            heavy_pages = self.find_heavy_pages(plan, rasterize_threshold)
+
+        # Replaced pages drop out of the output (their resources may be
+        # shared with other pages, so only the content streams count)
+        dropped_bytes = 0
+        for entry in source_entries:
+            if entry[3] is not None:
+                kind, value = self.pdf1.xref_get_key(
+                    self.pdf1.page_xref(entry[3]), "Contents")
+                if kind in ("xref", "array"):
+                    dropped_bytes += object_bytes(self.pdf1, value, set())
+
+        # Each distinct source page is copied once, each use adds a wrapper;
+        # heavy pages are replaced by one image each
+        seen = set()
+        source_bytes = 0
+        megapixels = 0
+        for page_idx in sorted({entry[1] for entry in source_entries}):
+            if page_idx in heavy_pages:
+                rect = self.pdf2[page_idx].rect
+                megapixels += rect.width * rect.height * (dpi / 72) ** 2 / 1e6
+            else:
+                source_bytes += page_bytes(self.pdf2, page_idx, seen)
+        source_bytes += RASTER_BYTES_PER_PIXEL * megapixels * 1e6
+
+        # Heavy pages are rendered in parallel before the merge
+        raster_seconds = 0
+        if heavy_pages:
+            workers = min(os.cpu_count() or 1, len(heavy_pages), 8)
+            raster_seconds = SECONDS_RASTER_POOL + (
+                SECONDS_PER_RASTER_MB * sum(heavy_pages.values()) / 2**20 +
+                SECONDS_PER_MEGAPIXEL * megapixels) / workers
+
+        output_bytes = max(0, pdf1_size - dropped_bytes) + source_bytes + \
+            PAGE_WRAPPER_BYTES * len(source_entries)
+
+        # Links are rewritten one by one; estimate their number from a
+        # sample of evenly spaced PDF1 pages
+        links = 0
+        if self.pdf1.page_count:
+            step = max(1, self.pdf1.page_count // LINK_SAMPLE_PAGES)
+            sample = range(0, self.pdf1.page_count, step)
+            for page_idx in sample:
+                kind, value = self.pdf1.xref_get_key(
+                    self.pdf1.page_xref(page_idx), "Annots")
+                if kind in ("array", "xref"):
+                    links += len(XREF_REFERENCE.findall(
+                        pdf_resolve(self.pdf1, value)))
+            links = links * main_pages / len(sample)
+
+        seconds = SECONDS_BASE + \
+            SECONDS_PER_MAIN_PAGE * main_pages + \
+            SECONDS_PER_SOURCE_PAGE * len(source_entries) + \
+            SECONDS_PER_MB * output_bytes / 2**20 + \
+            SECONDS_PER_LINK * links + \
+            raster_seconds
+
+        memory_bytes = MEMORY_BASE_BYTES + \
+            MEMORY_PER_OUTPUT_BYTE * output_bytes + \
+            MEMORY_PER_PAGE * len(plan) + \
+            MEMORY_PER_LINK * links
+
+        return {
+            "pages": len(plan),
+            "output_bytes": int(output_bytes),
+            "memory_bytes": int(memory_bytes),
+            "seconds": seconds,
+            "heavy_pages": heavy_pages,
+        }
+
+    def find_duplicate_pages(self, parsed_rules):
+        """Describe source pages that duplicate each other or the Main PDF"""
+        pdf1_fingerprints = PageFingerprints.for_file(self.main_path)
+        pdf2_fingerprints = PageFingerprints.for_file(self.source_path)
+
+        warnings = []
+        seen = {}
+        main_pages = None
+        for mode, pdf2_pages, pdf1_positions in parsed_rules:
+            for page in pdf2_pages:
+                fingerprint = pdf2_fingerprints.page(self.pdf2, page - 1)
+                if fingerprint in seen:
+                    warnings.append(
+                        f"PDF2 page {page} is identical to PDF2 page {seen[fingerprint]}")
+                else:
+                    seen[fingerprint] = page
+
+            if mode == "Replace existing pages":
+                for pos, page in zip(pdf1_positions, pdf2_pages):
+                    if pos <= self.pdf1.page_count and pdf1_fingerprints.page(self.pdf1, pos - 1) == pdf2_fingerprints.page(self.pdf2, page - 1):
+                        warnings.append(
+                            f"PDF2 page {page} is identical to PDF1 page {pos}, replacement skipped")
+                continue
+
+            if main_pages is None:
+                main_pages = {}
+                for i, fingerprint in enumerate(pdf1_fingerprints.all_pages(self.pdf1)):
+                    main_pages.setdefault(fingerprint, i + 1)
+            for page in pdf2_pages:
+                fingerprint = pdf2_fingerprints.page(self.pdf2, page - 1)
+                if fingerprint in main_pages:
+                    warnings.append(
+                        f"PDF2 page {page} is already in PDF1 as page {main_pages[fingerprint]}")
+
+        return warnings
+
+    def merge(self, parsed_rules, output=None, rasterize_threshold=None,
+              dpi=RASTERIZE_DPI, text_layer=True, progress=None):
+        """Merge the job and write the result.
+
+        output is a file path, a writable file object, or None to return
+        the merged PDF as bytes. Source pages whose content exceeds
+        rasterize_threshold bytes are rasterized; None disables this.
+        Afterwards copied, heavy_pages and rasterized describe what was
+        done.
+        """
+        plan = self.build_plan(parsed_rules)
+        self.heavy_pages = {}
+        self.rasterized = {}
+
+        # Every replacement was identical: the output is the Main PDF
+        self.copied = plan == [("main", i)
+                               for i in range(self.pdf1.page_count)]
+        if self.copied:
+            return self.copy_main(output)
+
+        if rasterize_threshold is not None:
+            self.heavy_pages = self.find_heavy_pages(
+                plan, rasterize_threshold)
+            if self.heavy_pages:
+                self.rasterized = self.rasterize_pages(
+                    sorted(self.heavy_pages), dpi, text_layer)
+
+        # Build the final PDF and write it once
+        merged_pdf = self.execute_plan(plan, self.rasterized, progress)
+        try:
+            # Rasterized pages are inserted as raw pixels, compress them
+            deflate_images = bool(self.rasterized)
+            if output is None:
+                return merged_pdf.tobytes(deflate_images=deflate_images)
+            if hasattr(output, "write"):
+                # Document.save reopens file objects by their name, so
+                # pipes and sys.stdout.buffer are written explicitly
+                output.write(merged_pdf.tobytes(deflate_images=deflate_images))
+            else:
+                merged_pdf.save(os.fspath(output), deflate_images=deflate_images)
+        finally:
+            merged_pdf.close()
+
+    def copy_main(self, output):
+        """Write the unchanged Main PDF to output (see merge)"""
+        if isinstance(self.main, str):
+            if output is None:
+                with open(self.main, "rb") as main_file:
+                    return main_file.read()
+            if hasattr(output, "write"):
+                with open(self.main, "rb") as main_file:
+                    shutil.copyfileobj(main_file, output)
+            else:
+                shutil.copyfile(self.main, output)
+        elif output is None:
+            return self.main
+        elif hasattr(output, "write"):
+            output.write(self.main)
+        else:
+            with open(output, "wb") as output_file:
+                output_file.write(self.main)
+
+
 class PDFMergerApp(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -14,6 +1291,7 @@ class PDFMergerApp(QMainWindow):
         self.pdf2_path = ""
         self.pdf1_pages = 0
         self.pdf2_pages = 0
+        self.rules = []
         self.initUI()
 
     def initUI(self):
@@ -76,7 +1354,7 @@ class PDFMergerApp(QMainWindow):
         grid_layout.addWidget(QLabel("Insert at PDF1 Positions:"), 1, 0)
         self.pdf1_insert_positions = QLineEdit()
         self.pdf1_insert_positions.setPlaceholderText(
-            "e.g., 2,4,6 (positions in Main PDF where to insert)")
+            "e.g., 2,4,6 or after:\"Appendix B\" or before:regex:^Section 4")
         grid_layout.addWidget(self.pdf1_insert_positions, 1, 1)
 
         # Insertion Mode
@@ -88,9 +1366,26 @@ class PDFMergerApp(QMainWindow):
 
         rules_layout.addLayout(grid_layout)
 
+        # Job rules, applied together in a single merge
+        rule_buttons_layout = QHBoxLayout()
+        add_rule_btn = QPushButton("Add Rule")
+        add_rule_btn.clicked.connect(self.add_rule)
+        add_rule_btn.setStyleSheet("padding: 5px 10px;")
+        remove_rule_btn = QPushButton("Remove Rule")
+        remove_rule_btn.clicked.connect(self.remove_rule)
+        remove_rule_btn.setStyleSheet("padding: 5px 10px;")
+        rule_buttons_layout.addWidget(add_rule_btn)
+        rule_buttons_layout.addWidget(remove_rule_btn)
+        rule_buttons_layout.addStretch()
+        rules_layout.addLayout(rule_buttons_layout)
+
+        self.rules_list = QListWidget()
+        self.rules_list.setMaximumHeight(80)
+        rules_layout.addWidget(self.rules_list)
+
         # Examples
         examples_label = QLabel(
-            "Examples:\n• '1,3' and '2,4' → PDF2 pages 1,3 replace PDF1 pages 2,4\n• '1-3' and '5' → PDF2 pages 1-3 inserted at PDF1 position 5\n• Leave empty for 'append at end' mode")
+            "Examples:\n• '1,3' and '2,4' → PDF2 pages 1,3 replace PDF1 pages 2,4\n• '1-3' and '5' → PDF2 pages 1-3 inserted at PDF1 position 5\n• 'after:\"Appendix B\"' → right after the first page containing 'Appendix B' (in Replace mode, that page itself)\n• Leave empty for 'append at end' mode\n• 'Add Rule' to combine several rules; all positions refer to the original PDF1 pages")
         examples_label.setWordWrap(True)
         examples_label.setStyleSheet(
             "color: #3498db; font-size: 11px; padding: 10px; background-color: #ebf5fb; border-radius: 5px;")
@@ -156,6 +1451,35 @@ class PDFMergerApp(QMainWindow):
         output_group.setLayout(output_layout)
         main_layout.addWidget(output_group)
 
+        # Heavy page rasterization
+        raster_group = QGroupBox("Heavy Page Rasterization")
+        raster_group.setStyleSheet(
+            "QGroupBox { font-weight: bold; margin-top: 15px; }")
+        raster_layout = QHBoxLayout()
+
+        self.rasterize_check = QCheckBox("Rasterize heavy source pages")
+        raster_layout.addWidget(self.rasterize_check)
+
+        raster_layout.addWidget(QLabel("Content above (KB):"))
+        self.rasterize_threshold = QSpinBox()
+        self.rasterize_threshold.setRange(1, 1000000)
+        self.rasterize_threshold.setValue(RASTERIZE_THRESHOLD_KB)
+        raster_layout.addWidget(self.rasterize_threshold)
+
+        raster_layout.addWidget(QLabel("DPI:"))
+        self.rasterize_dpi = QSpinBox()
+        self.rasterize_dpi.setRange(36, 1200)
+        self.rasterize_dpi.setValue(RASTERIZE_DPI)
+        raster_layout.addWidget(self.rasterize_dpi)
+
+        self.text_layer_check = QCheckBox("Keep invisible text layer")
+        self.text_layer_check.setChecked(True)
+        raster_layout.addWidget(self.text_layer_check)
+        raster_layout.addStretch()
+
+        raster_group.setLayout(raster_layout)
+        main_layout.addWidget(raster_group)
+
         # Action buttons
         button_layout = QHBoxLayout()
 
@@ -325,77 +1649,6 @@ class PDFMergerApp(QMainWindow):
         if directory:
             self.output_path.setText(directory)
 
-    def parse_page_range(self, page_str, max_pages, allow_all=False):
-        """Parse page range string like '1-5,7,9-12' or 'all'"""
-        if not page_str:
-            return [] if not allow_all else list(range(1, max_pages + 1))
-
-        if page_str.lower() == 'all':
-            return list(range(1, max_pages + 1))
-
-        pages = set()
-        parts = page_str.split(',')
-
-        for part in parts:
-            part = part.strip()
-            if '-' in part:
-                start, end = part.split('-')
-                try:
-                    start_page = max(1, int(start))
-                    end_page = min(max_pages, int(end))
-                    if start_page <= end_page:
-                        pages.update(range(start_page, end_page + 1))
-                except ValueError:
-                    continue
-            else:
-                try:
-                    page = int(part)
-                    if 1 <= page <= max_pages:
-                        pages.add(page)
-                except ValueError:
-                    continue
-
-        return sorted(list(pages))
-
-    def parse_positions(self, positions_str, max_pages):
-        """Parse positions string, handle 'mid' and 'end' special values"""
-        if not positions_str:
-            return []
-
-        positions = []
-        parts = positions_str.split(',')
-
-        for part in parts:
-            part = part.strip().lower()
-
-            if part == 'mid':
-                # Insert at middle position
-                mid_pos = max_pages // 2 + 1
-                positions.append(mid_pos)
-            elif part == 'end':
-                # Append at end
-                positions.append(max_pages + 1)
-            elif '-' in part:
-                # Range of positions
-                start, end = part.split('-')
-                try:
-                    start_pos = max(1, int(start))
-                    end_pos = min(max_pages + 1, int(end))
-                    if start_pos <= end_pos:
-                        positions.extend(range(start_pos, end_pos + 1))
-                except ValueError:
-                    continue
-            else:
-                # Single position
-                try:
-                    pos = int(part)
-                    if 1 <= pos <= max_pages + 1:
-                        positions.append(pos)
-                except ValueError:
-                    continue
-
-        return positions
-
     def set_quick_action(self, pages, positions):
         """Set up quick actions for common scenarios"""
         if not self.pdf2_path:
@@ -417,42 +1670,63 @@ class PDFMergerApp(QMainWindow):
 
         self.status_bar.showMessage("Quick action applied")
 
-    def resize_page_to_match(self, source_page, target_page_size):
-        """Resize source page to match target page size"""
-        # Get source and target page rectangles
-        source_rect = source_page.rect
-        target_rect = fitz.Rect(
-            0, 0, target_page_size.width, target_page_size.height)
-
-        # Calculate scaling factors
-        scale_x = target_rect.width / source_rect.width
-        scale_y = target_rect.height / source_rect.height
-
-        # Use the smaller scale to maintain aspect ratio
-        scale = min(scale_x, scale_y)
-
-        # Create a new blank page with target size
-        new_page = fitz.open()  # Create a temporary document
-        temp_page = new_page.new_page(
-            width=target_rect.width, height=target_rect.height)
-
-        # Calculate position to center the scaled page
-        scaled_width = source_rect.width * scale
-        scaled_height = source_rect.height * scale
-        x_pos = (target_rect.width - scaled_width) / 2
-        y_pos = (target_rect.height - scaled_height) / 2
-
-        # Create transformation matrix for scaling and positioning
-        matrix = fitz.Matrix(scale, scale).pretranslate(x_pos, y_pos)
+    def current_rule(self):
+        """Return the rule described by the rule input fields"""
+        return {
+            "mode": self.insertion_mode.currentText(),
+            "pages": self.pdf2_pages_to_insert.text(),
+            "positions": self.pdf1_insert_positions.text(),
+        }
+
+    def get_job_rules(self):
+        """Return the job's rules followed by the current fields.
+
+        Filled-in rule fields (typed or set by a quick action) that were
+        not added with 'Add Rule' still take part as the last rule.
+        """
+        rule = self.current_rule()
+        if not self.rules:
+            return [rule]
+        if rule["pages"].strip() or rule["positions"].strip():
+            return self.rules + [rule]
+        return list(self.rules)
+
+    def rule_problem(self, parsed_rules):
+        """Return a warning for the first incomplete parsed rule, or None"""
+        for mode, pdf2_pages, pdf1_positions in parsed_rules:
+            if not pdf2_pages:
+                return "Please specify which pages to insert from Source PDF!"
+            if mode != "Append at end" and not pdf1_positions:
+                return "Please specify where to insert the pages in Main PDF!"
+        return None
+
+    def describe_rule(self, rule):
+        pages = rule["pages"] or "all"
+        if rule["mode"] == "Append at end":
+            return f"{rule['mode']}: PDF2 pages {pages}"
+        return f"{rule['mode']}: PDF2 pages {pages} at PDF1 {rule['positions']}"
+
+    def add_rule(self):
+        """Add the current rule fields to the job's rule list"""
+        rule = self.current_rule()
+        if rule["mode"] != "Append at end" and not rule["positions"].strip():
+            QMessageBox.warning(
+                self, "Warning", "Please specify where to insert the pages in Main PDF!")
+            return
 
-        # Insert the source page into the new page
-        temp_page.show_pdf_page(
-            fitz.Rect(0, 0, target_rect.width, target_rect.height),
-            source_page.parent,
-            source_page.number
-        )
+        self.rules.append(rule)
+        self.rules_list.addItem(self.describe_rule(rule))
+        self.pdf2_pages_to_insert.clear()
+        self.pdf1_insert_positions.clear()
+        self.status_bar.showMessage(f"Rule {len(self.rules)} added")
 
-        return new_page
+    def remove_rule(self):
+        row = self.rules_list.currentRow()
+        if row < 0:
+            row = len(self.rules) - 1
+        if row >= 0:
+            del self.rules[row]
+            self.rules_list.takeItem(row)
 
     def merge_with_insertion(self):
         """Main function to merge PDFs with page insertion at specific positions"""
@@ -495,92 +1769,49 @@ class PDFMergerApp(QMainWindow):
             self.progress_bar.setValue(0)
             self.status_bar.showMessage("Processing PDFs...")
 
-            # Open PDFs
-            pdf1 = fitz.open(self.pdf1_path)  # Main PDF
-            pdf2 = fitz.open(self.pdf2_path)  # Source PDF
-
-            # Parse which pages to insert from PDF2
-            pdf2_pages_to_insert = self.parse_page_range(
-                self.pdf2_pages_to_insert.text(),
-                self.pdf2_pages,
-                allow_all=True
-            )
-
-            # Parse positions in PDF1 where to insert
-            mode = self.insertion_mode.currentText()
-            positions_str = self.pdf1_insert_positions.text()
+            rasterize_threshold = None
+            if self.rasterize_check.isChecked():
+                rasterize_threshold = self.rasterize_threshold.value() * 1024
+
+            with PDFMerger(self.pdf1_path, self.pdf2_path) as merger:
+                # Parse every rule against the original page numbers
+                parsed_rules = [merger.parse_rule(rule)
+                                for rule in self.get_job_rules()]
+
+                # Validate inputs
+                problem = self.rule_problem(parsed_rules)
+                if problem:
+                    QMessageBox.warning(self, "Warning", problem)
+                    self.progress_bar.setVisible(False)
+                    return
+
+                merger.merge(
+                    parsed_rules,
+                    output_path,
+                    rasterize_threshold=rasterize_threshold,
+                    dpi=self.rasterize_dpi.value(),
+                    text_layer=self.text_layer_check.isChecked(),
+                    progress=self.progress_bar.setValue)
 
-            if mode == "Append at end":
-                # Simple append all pages at the end
-                pdf1_pages_to_insert_at = [
-                    self.pdf1_pages + 1] * len(pdf2_pages_to_insert)
-            else:
-                # Parse positions
-                pdf1_pages_to_insert_at = self.parse_positions(
-                    positions_str,
-                    self.pdf1_pages
-                )
-
-            # Validate inputs
-            if not pdf2_pages_to_insert:
-                QMessageBox.warning(
-                    self, "Warning", "Please specify which pages to insert from Source PDF!")
-                return
-
-            if mode != "Append at end" and not pdf1_pages_to_insert_at:
-                QMessageBox.warning(
-                    self, "Warning", "Please specify where to insert the pages in Main PDF!")
+            self.progress_bar.setValue(100)
+            if merger.copied:
+                self.progress_bar.setVisible(False)
+                self.status_bar.showMessage(
+                    f"No page changes needed, copied Main PDF to: {output_path}")
                 return
 
-            # Adjust for 0-based indexing
-            pdf2_pages_idx = [p-1 for p in pdf2_pages_to_insert]
-            pdf1_positions_idx = [p-1 for p in pdf1_pages_to_insert_at]
-
-            # Create new PDF
-            merged_pdf = fitz.open()
-
-            # Handle different insertion modes
-            if mode == "Replace existing pages":
-                # Replace pages at specified positions
-                result_pages = self.replace_pages(
-                    pdf1, pdf2, pdf2_pages_idx, pdf1_positions_idx)
-            elif mode == "Insert before position":
-                # Insert before specified positions
-                result_pages = self.insert_pages_before(
-                    pdf1, pdf2, pdf2_pages_idx, pdf1_positions_idx)
-            elif mode == "Insert after position":
-                # Insert after specified positions
-                result_pages = self.insert_pages_after(
-                    pdf1, pdf2, pdf2_pages_idx, pdf1_positions_idx)
-            else:  # Append at end
-                result_pages = self.append_pages(pdf1, pdf2, pdf2_pages_idx)
-
-            # Build the final PDF
-            for i, page_info in enumerate(result_pages):
-                src_pdf, page_idx = page_info
-                merged_pdf.insert_pdf(
-                    src_pdf, from_page=page_idx, to_page=page_idx)
-                self.progress_bar.setValue(
-                    int((i + 1) * 100 / len(result_pages)))
-
-            # Save merged PDF
-            merged_pdf.save(output_path)
-            merged_pdf.close()
-
-            # Close all temporary documents
-            for src_pdf, _ in result_pages:
-                if src_pdf != pdf1 and src_pdf != pdf2:
-                    try:
-                        src_pdf.close()
-                    except:
-                        pass
-
-            pdf1.close()
-            pdf2.close()
-
-            self.progress_bar.setValue(100)
-            self.status_bar.showMessage(
-                f"PDF created successfully! Saved to: {output_path}")
+            message = f"PDF created successfully! Saved to: {output_path}"
+            if merger.rasterized:
+                rasterized = merger.rasterized.values()
+                content_bytes = sum(merger.heavy_pages.values())
+                image_bytes = sum(len(result[0]) for result in rasterized)
+                vector_seconds = sum(result[3] for result in rasterized)
+                image_seconds = sum(result[4] for result in rasterized)
+                message += (
+                    f" Rasterized {len(merger.rasterized)} heavy pages: content "
+                    f"{format_bytes(content_bytes)} → images {format_bytes(image_bytes)}, "
+                    f"render time {vector_seconds:.2f} s → {image_seconds:.2f} s")
+            self.status_bar.showMessage(message)
 
             # Ask if user wants to open the merged PDF
             reply = QMessageBox.question(
@@ -601,133 +1832,30 @@ class PDFMergerApp(QMainWindow):
             self.progress_bar.setVisible(False)
             self.status_bar.showMessage("Error processing PDFs")
 
-    def replace_pages(self, pdf1, pdf2, pdf2_pages_idx, pdf1_positions_idx):
-        """Replace pages in PDF1 with pages from PDF2 at specified positions"""
-        result_pages = []
-
-        # Ensure we have matching number of pages and positions
-        if len(pdf2_pages_idx) != len(pdf1_positions_idx):
-            # If positions are fewer, repeat the last position
-            if len(pdf1_positions_idx) < len(pdf2_pages_idx):
-                last_pos = pdf1_positions_idx[-1] if pdf1_positions_idx else 0
-                pdf1_positions_idx = pdf1_positions_idx + \
-                    [last_pos] * (len(pdf2_pages_idx) -
-                                  len(pdf1_positions_idx))
-
-        # Sort positions and corresponding pages
-        sorted_data = sorted(zip(pdf1_positions_idx, pdf2_pages_idx))
-        pdf1_positions_idx = [pos for pos, _ in sorted_data]
-        pdf2_pages_idx = [page for _, page in sorted_data]
-
-        pdf1_page_idx = 0
-        replace_idx = 0
-
-        for i in range(pdf1.page_count):
-            if replace_idx < len(pdf1_positions_idx) and i == pdf1_positions_idx[replace_idx]:
-                # Get the target page size from PDF1
-                target_page = pdf1[i]
-                target_size = target_page.rect
-
-                # Get the source page from PDF2
-                source_page = pdf2[pdf2_pages_idx[replace_idx]]
-
-                # Create a temporary document with resized page
-                temp_doc = self.resize_page_to_match(source_page, target_size)
-
-                # Add the resized page to result
-                result_pages.append((temp_doc, 0))
-
-                replace_idx += 1
+    def describe_plan(self, plan):
+        """Summarize a plan as output page ranges and their origin"""
+        lines = []
+        i = 0
+        while i < len(plan):
+            entry = plan[i]
+            start = i
+            if entry[0] == "main":
+                while i + 1 < len(plan) and plan[i + 1] == ("main", plan[i][1] + 1):
+                    i += 1
+                if start == i:
+                    lines.append(
+                        f"Page {start + 1}: PDF1 page {entry[1] + 1}")
+                else:
+                    lines.append(
+                        f"Pages {start + 1}-{i + 1}: PDF1 pages {entry[1] + 1}-{plan[i][1] + 1}")
+            elif entry[3] is not None:
+                lines.append(
+                    f"Page {start + 1}: PDF2 page {entry[1] + 1} (replaces PDF1 page {entry[3] + 1})")
             else:
-                # Keep original PDF1 page
-                result_pages.append((pdf1, i))
-
-        return result_pages
-
-    def insert_pages_before(self, pdf1, pdf2, pdf2_pages_idx, pdf1_positions_idx):
-        """Insert PDF2 pages before specified positions in PDF1"""
-        result_pages = []
-
-        # Get the standard page size from PDF1 (use first page as reference)
-        standard_size = pdf1[0].rect if pdf1.page_count > 0 else fitz.Rect(
-            0, 0, 595, 842)  # A4 default
-
-        # Sort positions in descending order to maintain correct indices when inserting
-        sorted_indices = sorted(
-            zip(pdf1_positions_idx, pdf2_pages_idx), reverse=True)
-
-        # Start with all PDF1 pages
-        result_pages = [(pdf1, i) for i in range(pdf1.page_count)]
-
-        # Insert PDF2 pages at specified positions
-        for pos_idx, pdf2_page_idx in sorted_indices:
-            if pos_idx <= len(result_pages):
-                # Get the source page from PDF2
-                source_page = pdf2[pdf2_page_idx]
-
-                # Create a temporary document with resized page
-                temp_doc = self.resize_page_to_match(
-                    source_page, standard_size)
-
-                # Insert the resized page
-                result_pages.insert(pos_idx, (temp_doc, 0))
-
-        return result_pages
-
-    def insert_pages_after(self, pdf1, pdf2, pdf2_pages_idx, pdf1_positions_idx):
-        """Insert PDF2 pages after specified positions in PDF1"""
-        result_pages = []
-
-        # Get the standard page size from PDF1 (use first page as reference)
-        standard_size = pdf1[0].rect if pdf1.page_count > 0 else fitz.Rect(
-            0, 0, 595, 842)  # A4 default
-
-        # Sort positions in descending order to maintain correct indices when inserting
-        sorted_indices = sorted(
-            zip(pdf1_positions_idx, pdf2_pages_idx), reverse=True)
-
-        # Start with all PDF1 pages
-        result_pages = [(pdf1, i) for i in range(pdf1.page_count)]
-
-        # Insert PDF2 pages after specified positions
-        for pos_idx, pdf2_page_idx in sorted_indices:
-            insert_pos = pos_idx + 1
-            if insert_pos <= len(result_pages):
-                # Get the source page from PDF2
-                source_page = pdf2[pdf2_page_idx]
-
-                # Create a temporary document with resized page
-                temp_doc = self.resize_page_to_match(
-                    source_page, standard_size)
-
-                # Insert the resized page
-                result_pages.insert(insert_pos, (temp_doc, 0))
-
-        return result_pages
-
-    def append_pages(self, pdf1, pdf2, pdf2_pages_idx):
-        """Append PDF2 pages at the end of PDF1"""
-        result_pages = []
-
-        # Get the standard page size from PDF1 (use first page as reference)
-        standard_size = pdf1[0].rect if pdf1.page_count > 0 else fitz.Rect(
-            0, 0, 595, 842)  # A4 default
-
-        # Add all PDF1 pages
-        result_pages.extend([(pdf1, i) for i in range(pdf1.page_count)])
-
-        # Append PDF2 pages (resized)
-        for page_idx in pdf2_pages_idx:
-            # Get the source page from PDF2
-            source_page = pdf2[page_idx]
-
-            # Create a temporary document with resized page
-            temp_doc = self.resize_page_to_match(source_page, standard_size)
-
-            # Append the resized page
-            result_pages.append((temp_doc, 0))
-
-        return result_pages
+                lines.append(
+                    f"Page {start + 1}: PDF2 page {entry[1] + 1} (inserted)")
+            i += 1
+        return lines
 
     def preview_result(self):
         """Preview what the result will look like"""
@@ -741,24 +1869,23 @@ class PDFMergerApp(QMainWindow):
             pdf1_name = os.path.basename(self.pdf1_path)
             pdf2_name = os.path.basename(self.pdf2_path)
 
-            # Parse inputs
-            pdf2_pages_to_insert = self.parse_page_range(
-                self.pdf2_pages_to_insert.text(),
-                self.pdf2_pages,
-                allow_all=True
-            )
-
-            mode = self.insertion_mode.currentText()
-            positions_str = self.pdf1_insert_positions.text()
-
-            if mode == "Append at end":
-                pdf1_pages_to_insert_at = [
-                    "end"] * len(pdf2_pages_to_insert) if pdf2_pages_to_insert else []
-            else:
-                pdf1_pages_to_insert_at = self.parse_positions(
-                    positions_str,
-                    self.pdf1_pages
-                )
+            rules = self.get_job_rules()
+            with PDFMerger(self.pdf1_path, self.pdf2_path) as merger:
+                parsed_rules = [merger.parse_rule(rule) for rule in rules]
+                problem = self.rule_problem(parsed_rules)
+                if problem:
+                    self.preview_area.setVisible(False)
+                    QMessageBox.warning(self, "Warning", problem)
+                    return
+
+                plan = merger.build_plan(parsed_rules)
+                rasterize_threshold = None
+                if self.rasterize_check.isChecked():
+                    rasterize_threshold = self.rasterize_threshold.value() * 1024
+                cost = merger.estimate_cost(
+                    plan, rasterize_threshold, self.rasterize_dpi.value())
+                heavy_pages = cost["heavy_pages"]
+                warnings = merger.find_duplicate_pages(parsed_rules)
 
             # Build preview text
             preview_text = f"""
@@ -770,42 +1897,33 @@ class PDFMergerApp(QMainWindow):
             SOURCE PDF: {pdf2_name}
             Total Pages: {self.pdf2_pages}
             
-            ===== OPERATION DETAILS =====
-            Mode: {mode}
-            
-            Pages to insert from {pdf2_name}: {pdf2_pages_to_insert if pdf2_pages_to_insert else 'ALL PAGES'}
-            Insert at positions in {pdf1_name}: {pdf1_pages_to_insert_at if pdf1_pages_to_insert_at else 'APPEND AT END'}
-            
             ===== RESULT PREVIEW =====
-            Final document will have approximately {self.pdf1_pages + len(pdf2_pages_to_insert)} pages.
+            Final document will have {len(plan)} pages.
+            
+            ===== COST ESTIMATE (dry run) =====
+            Output size: ~{format_bytes(cost['output_bytes'])}
+            Peak memory: ~{format_bytes(cost['memory_bytes'])}
+            Duration: ~{cost['seconds']:.1f} s
             
             """
 
-            # Add specific instructions based on mode
-            if mode == "Replace existing pages" and pdf1_pages_to_insert_at:
-                preview_text += "\nREPLACEMENT MAPPING:\n"
-                for i, (pos, page) in enumerate(zip(pdf1_pages_to_insert_at, pdf2_pages_to_insert)):
-                    if i < len(pdf2_pages_to_insert):
-                        preview_text += f"  • PDF1 page {pos} ← PDF2 page {page}\n"
-
-            elif mode == "Insert before position" and pdf1_pages_to_insert_at:
-                preview_text += "\nINSERTION POINTS:\n"
-                for i, (pos, page) in enumerate(zip(pdf1_pages_to_insert_at, pdf2_pages_to_insert)):
-                    if i < len(pdf2_pages_to_insert):
-                        preview_text += f"  • Insert PDF2 page {page} BEFORE PDF1 page {pos}\n"
-
-            elif mode == "Insert after position" and pdf1_pages_to_insert_at:
-                preview_text += "\nINSERTION POINTS:\n"
-                for i, (pos, page) in enumerate(zip(pdf1_pages_to_insert_at, pdf2_pages_to_insert)):
-                    if i < len(pdf2_pages_to_insert):
-                        preview_text += f"  • Insert PDF2 page {page} AFTER PDF1 page {pos}\n"
-
-            elif mode == "Append at end":
-                preview_text += "\nAPPEND OPERATION:\n"
-                if pdf2_pages_to_insert:
-                    preview_text += f"  • Appending {len(pdf2_pages_to_insert)} pages from PDF2 at the end\n"
-                else:
-                    preview_text += "  • Appending ALL pages from PDF2 at the end\n"
+            preview_text += "\nRULES (applied to original PDF1 page numbers):\n"
+            for i, rule in enumerate(rules):
+                preview_text += f"  {i + 1}. {self.describe_rule(rule)}\n"
+
+            preview_text += "\nOUTPUT PAGES:\n"
+            for line in self.describe_plan(plan):
+                preview_text += f"  • {line}\n"
+
+            if heavy_pages:
+                preview_text += f"\nHEAVY PAGES (rasterized at {self.rasterize_dpi.value()} DPI):\n"
+                for page_idx, size in sorted(heavy_pages.items()):
+                    preview_text += f"  • PDF2 page {page_idx + 1}: {format_bytes(size)} of content\n"
+
+            if warnings:
+                preview_text += "\nDUPLICATE WARNINGS:\n"
+                for warning in warnings:
+                    preview_text += f"  • {warning}\n"
 
             self.preview_area.setText(preview_text)
 
@@ -821,8 +1939,11 @@ class PDFMergerApp(QMainWindow):
         self.pdf2_pages_to_insert.clear()
         self.pdf1_insert_positions.clear()
         self.output_name.clear()
+        self.rules = []
+        self.rules_list.clear()
         self.output_path.setText(str(Path.home() / "Downloads"))
         self.insertion_mode.setCurrentIndex(0)
+        self.rasterize_check.setChecked(False)
         self.view_btn1.setEnabled(False)
         self.view_btn2.setEnabled(False)
         self.merge_btn.setEnabled(False)
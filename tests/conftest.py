@@ -0,0 +1,53 @@
+import os
+import sys
+
+import fitz
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_pdf(path, texts, width=595, height=842, rotation=0):
+    """Write a PDF with one page per text and return its path"""
+    doc = fitz.open()
+    for text in texts:
+        page = doc.new_page(width=width, height=height)
+        page.insert_text((72, 72), text)
+        if rotation:
+            page.set_rotation(rotation)
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    from PyQt5.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def app(qapp, tmp_path):
+    """A PDFMergerApp with an 8 page Main PDF and a 3 page Source PDF"""
+    import pdf_inserter
+
+    window = pdf_inserter.PDFMergerApp()
+    window.pdf1_path = make_pdf(
+        tmp_path / "main.pdf",
+        [f"Main page {i}" for i in range(1, 8)] + ["Appendix B"])
+    window.pdf2_path = make_pdf(
+        tmp_path / "source.pdf", [f"Source page {i}" for i in range(1, 4)])
+    window.pdf1_pages = 8
+    window.pdf2_pages = 3
+    yield window
+    window.close()
+
+
+@pytest.fixture
+def merger(app):
+    """A PDFMerger over the app fixture's Main and Source PDFs"""
+    from pdf_inserter import PDFMerger
+
+    with PDFMerger(app.pdf1_path, app.pdf2_path) as merger:
+        yield merger
@@ -0,0 +1,343 @@
+import pytest
+
+from conftest import make_pdf
+from pdf_inserter import PDFMerger
+
+
+def output_texts(data):
+    import fitz
+
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        return [page.get_text().strip() for page in doc]
+
+
+@pytest.mark.parametrize("mode, positions, expected", [
+    ("Insert before position", 'before:"Main page 3"', [3]),
+    ("Insert before position", 'after:"Main page 3"', [4]),
+    ("Insert after position", 'after:"Main page 3"', [3]),
+    ("Insert after position", 'before:"Main page 3"', [2]),
+    ("Replace existing pages", 'after:"Main page 3"', [3]),
+    ("Replace existing pages", 'before:"Main page 3"', [3]),
+    ("Insert after position", 'after:"Appendix B"', [8]),
+    ("Insert before position", 'after:"Appendix B"', [9]),
+])
+def test_anchor_resolves_against_mode(merger, mode, positions, expected):
+    assert merger.parse_positions(positions, mode) == expected
+
+
+def test_anchor_without_position_is_rejected(merger):
+    with pytest.raises(ValueError):
+        merger.parse_positions('before:"Main page 1"', "Insert after position")
+
+
+def test_anchor_resolves_in_memory_main(app):
+    from pdf_inserter import PageTextIndex
+
+    with open(app.pdf1_path, "rb") as main:
+        data = main.read()
+    PageTextIndex._cache.clear()
+    with PDFMerger(data, app.pdf2_path) as merger:
+        assert merger.parse_positions('after:"Appendix B"') == [9]
+        assert merger.parse_rule({"mode": "Insert after position", "pages": "2",
+                                  "positions": 'after:regex:page \\d$'}) == (
+            "Insert after position", [2], [1])
+    assert not PageTextIndex._cache
+
+
+def test_text_index_cache_keeps_few_files(tmp_path):
+    from pdf_inserter import CACHED_FILES, PageTextIndex
+
+    paths = [make_pdf(tmp_path / f"doc{i}.pdf", [f"Document {i}", "Section 4  of  it"])
+             for i in range(CACHED_FILES + 2)]
+    for path in paths:
+        index = PageTextIndex.for_file(path)
+    assert len(PageTextIndex._cache) == CACHED_FILES
+    assert PageTextIndex.for_file(paths[-1]) is index
+    assert index.find("Section 4 of") == 1
+    assert index.find(r"^Section \d", regex=True) == 1
+    assert set(vars(index)) == {"texts"}
+
+
+def test_after_anchor_inserts_after_matching_page(merger):
+    rule = {"mode": "Insert after position", "pages": "1",
+            "positions": 'after:"Main page 3"'}
+    data = merger.merge([merger.parse_rule(rule)])
+    assert output_texts(data)[2:5] == [
+        "Main page 3", "Source page 1", "Main page 4"]
+
+
+def test_rules_compose_against_original_page_numbers(merger):
+    rules = [
+        {"mode": "Replace existing pages", "pages": "1", "positions": "2"},
+        {"mode": "Insert before position", "pages": "2", "positions": "4"},
+        {"mode": "Insert after position", "pages": "3", "positions": "4"},
+        {"mode": "Append at end", "pages": "1", "positions": ""},
+    ]
+    data = merger.merge([merger.parse_rule(rule) for rule in rules])
+    assert output_texts(data) == [
+        "Main page 1", "Source page 1", "Main page 3", "Source page 2",
+        "Main page 4", "Source page 3", "Main page 5", "Main page 6",
+        "Main page 7", "Appendix B", "Source page 1"]
+
+
+def test_insert_rule_without_positions_is_reported(app, monkeypatch):
+    import pdf_inserter
+
+    warnings, errors = [], []
+    monkeypatch.setattr(pdf_inserter.QMessageBox, "warning",
+                        lambda parent, title, text: warnings.append(text))
+    monkeypatch.setattr(pdf_inserter.QMessageBox, "critical",
+                        lambda parent, title, text: errors.append(text))
+    app.insertion_mode.setCurrentText("Insert after position")
+    app.pdf2_pages_to_insert.setText("1")
+    app.pdf1_insert_positions.setText("99")
+
+    app.preview_result()
+    assert warnings == ["Please specify where to insert the pages in Main PDF!"]
+    assert not errors
+
+    rules = [("Insert after position", [1], [])]
+    with PDFMerger(app.pdf1_path, app.pdf2_path) as merger:
+        assert merger.build_plan(rules) == [("main", i) for i in range(8)]
+
+
+def cyclic_resources_pdf(path):
+    """Two pages whose resources enter the same reference cycle at
+    different objects"""
+    import fitz
+
+    doc = fitz.open()
+    first, second = doc.get_new_xref(), doc.get_new_xref()
+    doc.update_object(first, f"<</Next {second} 0 R>>")
+    doc.update_object(second, f"<</Next {first} 0 R>>")
+    for xref in (first, second):
+        page = doc.new_page()
+        page.insert_text((72, 72), "Same text")
+        kind, resources = doc.xref_get_key(page.xref, "Resources")
+        if kind == "xref":
+            resources = doc.xref_object(int(resources.split()[0]))
+        doc.xref_set_key(
+            page.xref, "Resources",
+            resources.rstrip()[:-2] + f"/Properties<</P {xref} 0 R>>>>")
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+def test_fingerprints_do_not_depend_on_hashing_order(tmp_path):
+    import fitz
+    from pdf_inserter import PageFingerprints
+
+    with fitz.open(cyclic_resources_pdf(tmp_path / "cycle.pdf")) as doc:
+        forward = PageFingerprints()
+        forward_pages = [forward.page(doc, 0), forward.page(doc, 1)]
+        backward = PageFingerprints()
+        backward_pages = [backward.page(doc, 1), backward.page(doc, 0)][::-1]
+    assert forward_pages == backward_pages
+
+
+def content_pdf(path, content):
+    """One page PDF whose content stream is replaced by content"""
+    import fitz
+
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 72), "placeholder")
+    doc.update_stream(page.get_contents()[0], content)
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+@pytest.mark.parametrize("source_content, copied", [
+    (b"BT /helv 11 Tf 72 700 Td (Total: 100) Tj ET", False),
+    (b"BT\n/helv  11 Tf 72 700 Td\n(Total:  100)Tj\nET\n", True),
+])
+def test_fingerprints_keep_whitespace_inside_strings(tmp_path, source_content, copied):
+    main = content_pdf(tmp_path / "main.pdf",
+                       b"BT /helv 11 Tf 72 700 Td (Total:  100) Tj ET")
+    source = content_pdf(tmp_path / "source.pdf", source_content)
+    with PDFMerger(main, source) as merger:
+        merger.merge([("Replace existing pages", [1], [1])])
+        assert merger.copied is copied
+
+
+def test_fingerprint_cache_keeps_only_digests(merger):
+    from pdf_inserter import PageFingerprints
+
+    rule = {"mode": "Replace existing pages", "pages": "1", "positions": "1"}
+    merger.build_plan([merger.parse_rule(rule)])
+
+    fingerprints = PageFingerprints.for_file(merger.main_path)
+    assert set(vars(fingerprints)) == {"pages", "objects"}
+    assert fingerprints.pages
+    assert all(isinstance(digest, str)
+               for digest in fingerprints.pages.values())
+
+
+def test_filled_rule_fields_join_the_rule_list(app):
+    app.pdf2_pages_to_insert.setText("1")
+    app.pdf1_insert_positions.setText("2")
+    app.add_rule()
+    assert app.get_job_rules() == app.rules
+
+    app.set_quick_action("2", "end")
+    rules = app.get_job_rules()
+    assert len(rules) == 2
+    assert rules[-1] == {"mode": "Append at end", "pages": "2", "positions": ""}
+
+
+def linked_pdf(path, rotation=0):
+    """Three page PDF whose first page links to page 3, once directly and
+    once through a named destination"""
+    import fitz
+
+    doc = fitz.open()
+    for i in range(3):
+        page = doc.new_page(width=612, height=792)
+        page.insert_text((72, 72), f"Main page {i + 1}")
+        if rotation:
+            page.set_rotation(rotation)
+    target = doc.page_xref(2)
+
+    names = doc.get_new_xref()
+    doc.update_object(names, f"<</Names[(chapter) [{target} 0 R/XYZ 20 700 0]]>>")
+    doc.xref_set_key(doc.pdf_catalog(), "Names", f"<</Dests {names} 0 R>>")
+
+    annots = []
+    for rect, dest in (("[50 712 150 742]", f"/Dest[{target} 0 R/XYZ 10 802 0]"),
+                       ("[50 612 150 642]", "/A<</S/GoTo/D(chapter)>>")):
+        xref = doc.get_new_xref()
+        doc.update_object(
+            xref, f"<</Type/Annot/Subtype/Link/Rect{rect}{dest}>>")
+        annots.append(f"{xref} 0 R")
+    doc.xref_set_key(doc.page_xref(0), "Annots", f"[{' '.join(annots)}]")
+    doc.set_toc([[1, "Chapter", 3]])
+    outline = doc.get_toc(simple=False)[0][3]["xref"]
+    doc.xref_set_key(outline, "A", f"<</S/GoTo/D[{target} 0 R/XYZ 30 600 0]>>")
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+@pytest.mark.parametrize("rotation", [0, 90])
+def test_links_keep_their_coordinates(tmp_path, rotation):
+    import fitz
+
+    main = linked_pdf(tmp_path / "main.pdf", rotation)
+    source = make_pdf(tmp_path / "source.pdf", ["Source page 1"])
+
+    rules = [("Insert before position", [1], [2])]
+    with PDFMerger(main, source) as merger:
+        data = merger.merge(rules)
+
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        target = doc.page_xref(3)
+        kind, annots = doc.xref_get_key(doc.page_xref(0), "Annots")
+        links = [doc.xref_object(int(xref), compressed=True)
+                 for xref in annots[1:-1].split()[::3]]
+        bookmark = doc.xref_get_key(
+            doc.get_toc(simple=False)[0][3]["xref"], "A/D")[1]
+    assert bookmark == f"[{target} 0 R/XYZ 30 600 0]"
+    assert "/Rect[50 712 150 742]" in links[0]
+    assert f"/Dest[{target} 0 R/XYZ 10 802 0]" in links[0]
+    assert "/Rect[50 612 150 642]" in links[1]
+    assert f"/Dest[{target} 0 R/XYZ 20 700 0]" in links[1]
+
+
+def test_estimate_counts_indirect_annots(tmp_path):
+    import fitz
+
+    main = linked_pdf(tmp_path / "main.pdf")
+    source = make_pdf(tmp_path / "source.pdf", ["Source page 1"])
+    rules = [("Append at end", [1], [4])]
+    with PDFMerger(main, source) as merger:
+        inline = merger.estimate_cost(merger.build_plan(rules))
+
+    with fitz.open(main) as doc:
+        kind, annots = doc.xref_get_key(doc.page_xref(0), "Annots")
+        xref = doc.get_new_xref()
+        doc.update_object(xref, annots)
+        doc.xref_set_key(doc.page_xref(0), "Annots", f"{xref} 0 R")
+        doc.save(str(tmp_path / "indirect.pdf"))
+    with PDFMerger(str(tmp_path / "indirect.pdf"), source) as merger:
+        indirect = merger.estimate_cost(merger.build_plan(rules))
+
+    # Two links add 0.5%; the slightly larger file alone stays well below
+    assert indirect["seconds"] == pytest.approx(inline["seconds"], rel=1e-3)
+
+
+def test_estimate_costs_heavy_pages_as_images(tmp_path):
+    main = make_pdf(tmp_path / "main.pdf", ["Main page 1"])
+    source = make_pdf(tmp_path / "source.pdf", ["Source page 1"])
+    rules = [("Append at end", [1], [2])]
+    with PDFMerger(main, source) as merger:
+        plan = merger.build_plan(rules)
+        vector = merger.estimate_cost(plan)
+        raster = merger.estimate_cost(plan, rasterize_threshold=0)
+
+    assert vector["heavy_pages"] == {}
+    assert list(raster["heavy_pages"]) == [0]
+    assert raster["output_bytes"] > vector["output_bytes"]
+    assert raster["seconds"] > vector["seconds"]
+
+
+@pytest.mark.parametrize("rotation", [0, 90])
+def test_rasterized_text_layer(tmp_path, rotation):
+    import fitz
+
+    main = make_pdf(tmp_path / "main.pdf", ["Main page 1"])
+    source = make_pdf(tmp_path / "source.pdf", ["Heavy 0 words here"],
+                      rotation=rotation)
+    with PDFMerger(main, source) as merger:
+        data = merger.merge([("Append at end", [1], [2])],
+                            rasterize_threshold=0, dpi=72)
+        assert list(merger.rasterized) == [0]
+
+    with fitz.open(source) as doc:
+        page = doc[0]
+        expected = fitz.Rect(page.get_text("words")[0][:4]) * page.rotation_matrix
+        source_rect = page.rect
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        page = doc[1]
+        assert page.get_text().split() == ["Heavy", "0", "words", "here"]
+        assert len(page.get_contents()) == 2  # image and text layer
+        word = fitz.Rect(page.get_text("words")[0][:4])
+
+    # Same fit-and-center placement as the image
+    scale = min(595 / source_rect.width, 842 / source_rect.height)
+    expected = expected * fitz.Matrix(scale, scale) * fitz.Matrix(
+        1, 0, 0, 1, (595 - source_rect.width * scale) / 2,
+        (842 - source_rect.height * scale) / 2)
+    assert abs(word.x0 - expected.x0) < 3 and abs(word.y1 - expected.y1) < 3
+
+
+def test_merge_streams_to_a_pipe(app):
+    import os
+    import threading
+
+    rules = [("Insert before position", [1, 2, 3], [2, 2, 2])]
+    read_fd, write_fd = os.pipe()
+    received = []
+    reader = threading.Thread(
+        target=lambda: received.append(os.fdopen(read_fd, "rb").read()))
+    reader.start()
+    with os.fdopen(write_fd, "wb") as pipe:
+        with PDFMerger(app.pdf1_path, app.pdf2_path) as merger:
+            merger.merge(rules, pipe)
+    reader.join()
+
+    texts = output_texts(received[0])
+    assert len(texts) == 11
+    assert texts[:3] == ["Main page 1", "Source page 1", "Source page 2"]
+
+
+def test_memoryview_inputs_rasterize(app):
+    with open(app.pdf1_path, "rb") as main, open(app.pdf2_path, "rb") as source:
+        main_view = memoryview(bytearray(main.read()))
+        source_view = memoryview(bytearray(source.read()))
+    with PDFMerger(main_view, source_view) as merger:
+        data = merger.merge([("Append at end", [1, 2], [9, 9])],
+                            rasterize_threshold=0, dpi=36)
+        assert sorted(merger.rasterized) == [0, 1]
+    assert output_texts(data)[-2:] == ["Source page 1", "Source page 2"]